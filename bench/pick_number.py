@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Latency of picking a free number as the country's inventory grows.
+
+Compares the indexed random probe used by NumbersDB.get_available_number
+with the ORDER BY RANDOM() query it replaced. Runs against a throwaway
+database:
+
+    python bench/pick_number.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-")
+os.environ["DB_NAME"] = os.path.join(WORKDIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import db
+from database.numbers import PROBE_FREE_NUMBER
+
+SIZES = (1000, 10000, 100000, 300000)
+PICKS = 200
+RANDOM_PICKS = 20
+
+ORDER_BY_RANDOM = """SELECT * FROM numbers
+    WHERE country_code = ? AND is_assigned = 0
+    ORDER BY RANDOM() LIMIT 1"""
+
+async def timed(query, params, rounds: int) -> float:
+    """Mean milliseconds per fetch"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await db.fetch_one(query, params)
+    return (time.perf_counter() - started) / rounds * 1000
+
+async def main():
+    await db.connect()
+    print(f"{'free rows':>10}  {'index probe':>12}  {'ORDER BY RANDOM()':>18}")
+    total = 0
+    for size in SIZES:
+        async with db.transaction() as conn:
+            await conn.executemany(
+                "INSERT INTO numbers (country_code, phone_number) VALUES ('IN', ?)",
+                [(f"+91{number:010d}",) for number in range(total, size)]
+            )
+        total = size
+        probe = await timed(PROBE_FREE_NUMBER, ('IN', 'IN', 'IN'), PICKS)
+        random_pick = await timed(ORDER_BY_RANDOM, ('IN',), RANDOM_PICKS)
+        print(f"{size:>10}  {probe:>9.3f} ms  {random_pick:>15.3f} ms")
+    await db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
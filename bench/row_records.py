@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Cost of building result rows: sqlite3.Row copied into dicts vs records.
+
+Times and measures (tracemalloc) the per-row cost of both row shapes on
+the users table, then the DAO-level price lookup before and after it was
+projected to a single column. Runs against a throwaway database:
+
+    python bench/row_records.py
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-")
+os.environ["DB_NAME"] = os.path.join(WORKDIR, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import db
+from database.countries import CountriesDB, GET_COUNTRY
+from database.records import User, row_factory
+
+USERS = 20000
+ROUNDS = 9
+LOOKUPS = 3000
+
+def row_dicts(conn) -> list:
+    """The old shape: SELECT * through sqlite3.Row, copied into dicts"""
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("SELECT * FROM users")
+    return [dict(row) for row in cursor.fetchall()]
+
+def records(conn) -> list:
+    """The current shape: explicit columns straight into User records"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {User.select()} FROM users")
+    cursor.row_factory = row_factory(User, cursor.description)
+    return cursor.fetchall()
+
+def measure(fetch, conn):
+    """Best ns per row, then retained and peak bytes per row"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fetch(conn)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    rows = fetch(conn)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return best / USERS * 1e9, retained / USERS, peak / USERS
+
+async def per_lookup(fetch) -> float:
+    """Best mean microseconds per awaited lookup"""
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(LOOKUPS):
+            await fetch()
+        best = min(best, (time.perf_counter() - started) / LOOKUPS)
+    return best * 1e6
+
+async def main():
+    await db.connect()
+    async with db.transaction() as conn:
+        await conn.executemany(
+            "INSERT INTO users (user_id, username) VALUES (?, ?)",
+            [(user_id, f"user{user_id}") for user_id in range(USERS)]
+        )
+    await CountriesDB.add_country('IN', 'India', 50)
+
+    conn = sqlite3.connect(os.environ["DB_NAME"])
+    print(f"{USERS} users rows")
+    print(f"{'shape':>10}  {'time':>10}  {'retained':>10}  {'peak':>10}")
+    for name, fetch in (("Row+dict", row_dicts), ("record", records)):
+        ns, retained, peak = measure(fetch, conn)
+        print(f"{name:>10}  {ns:>7.0f} ns  {retained:>8.0f} B  {peak:>8.0f} B")
+    conn.close()
+
+    async def whole_country_as_dict():
+        row = await db.fetch_one(GET_COUNTRY._replace(record=None), ('IN',))
+        return dict(row)['price']
+
+    print()
+    print(f"get_country + dict for the price: {await per_lookup(whole_country_as_dict):6.1f} us")
+    print(f"get_price (projected column):     {await per_lookup(lambda: CountriesDB.get_price('IN')):6.1f} us")
+    print(f"get_country (record):             {await per_lookup(lambda: CountriesDB.get_country('IN')):6.1f} us")
+    await db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
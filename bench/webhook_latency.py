@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Ack and end-to-end latency of /start updates through the webhook server.
+
+Starts the bot in webhook mode against a throwaway database, with a fake
+Bot API transport standing in for api.telegram.org, and posts synthetic
+/start updates to the embedded server:
+
+  * sequentially, timing the HTTP acknowledgement and the time until the
+    handler's reply reaches the Bot API;
+  * as a concurrent burst, timing when all are acknowledged and handled.
+
+No secret is configured, so it also checks the one the bot generates and
+registers with setWebhook is enforced. Run with:
+
+    python bench/webhook_latency.py
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-")
+os.environ.update(
+    DB_NAME=os.path.join(WORKDIR, "bench.db"),
+    BOT_TOKEN="1:bench",
+    WEBHOOK_URL="https://bench.invalid",
+    WEBHOOK_HOST="127.0.0.1",
+    WEBHOOK_PORT=os.environ.get("WEBHOOK_PORT", "18443"),
+    WEBHOOK_SECRET="",
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from telegram.ext import Application
+from telegram.request import BaseRequest
+
+from bot import VirtualNumbersBot
+from config import WEBHOOK_PATH, WEBHOOK_PORT
+from services.webhook import SECRET_HEADER
+
+UPDATES = 200
+URL = f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+
+class FakeBotApi(BaseRequest):
+    """Answers Bot API calls locally and notes when each chat got a reply"""
+
+    def __init__(self):
+        self.replied = {}
+        self.webhook = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 5
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        result = True
+        if name == "getMe":
+            result = {'id': 1, 'is_bot': True, 'first_name': "bench", 'username': "bench_bot"}
+        elif name == "setWebhook":
+            self.webhook = params
+        elif name in ("sendMessage", "sendPhoto", "editMessageText"):
+            chat_id = int(params.get('chat_id', 0))
+            self.replied.setdefault(chat_id, time.perf_counter())
+            result = {'message_id': 1, 'date': 0, 'chat': {'id': chat_id, 'type': "private"}, 'text': ""}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+def start_update(update_id: int) -> dict:
+    user = {'id': 1000 + update_id, 'is_bot': False, 'first_name': "u", 'username': f"u{update_id}"}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': "/start",
+            'entities': [{'type': "bot_command", 'offset': 0, 'length': 6}],
+            'chat': {'id': user['id'], 'type': "private"}, 'from': user,
+        },
+    }
+
+def percentile(samples: list, fraction: float) -> float:
+    """Milliseconds at the given fraction of the sorted samples"""
+    ordered = sorted(samples)
+    return ordered[max(0, int(len(ordered) * fraction) - 1)] * 1000
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+async def main():
+    api = FakeBotApi()
+    bot = VirtualNumbersBot()
+    bot.application = Application.builder().token("1:bench").request(api).updater(None).build()
+    bot.setup_handlers()
+    runner = asyncio.create_task(bot.run_webhook())
+    await wait_for(lambda: api.webhook is not None)
+
+    headers = {SECRET_HEADER: api.webhook['secret_token']}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(URL, json=start_update(0)) as response:
+            print(f"without secret: HTTP {response.status}")
+        async with session.post(URL, json=start_update(0), headers={SECRET_HEADER: "guess"}) as response:
+            print(f"wrong secret:   HTTP {response.status}")
+
+        acks, handled = [], []
+        for update_id in range(1, UPDATES + 1):
+            started = time.perf_counter()
+            async with session.post(URL, json=start_update(update_id), headers=headers) as response:
+                assert response.status == 200
+            acks.append(time.perf_counter() - started)
+            await wait_for(lambda: 1000 + update_id in api.replied)
+            handled.append(api.replied[1000 + update_id] - started)
+        print(f"sequential /start x{UPDATES}: "
+              f"ack p50 {percentile(acks, .5):.2f} ms, p99 {percentile(acks, .99):.2f} ms; "
+              f"reply p50 {percentile(handled, .5):.2f} ms, p95 {percentile(handled, .95):.2f} ms, "
+              f"p99 {percentile(handled, .99):.2f} ms")
+
+        async def post(update_id: int) -> int:
+            async with session.post(URL, json=start_update(update_id), headers=headers) as response:
+                return response.status
+
+        burst = range(UPDATES + 1, 2 * UPDATES + 1)
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(post(update_id) for update_id in burst))
+        acked = time.perf_counter() - started
+        await wait_for(lambda: all(1000 + update_id in api.replied for update_id in burst))
+        done = time.perf_counter() - started
+        print(f"burst /start x{UPDATES}: all acked in {acked * 1000:.0f} ms, "
+              f"all replied in {done * 1000:.0f} ms, statuses {sorted(set(statuses))}")
+
+    signal.raise_signal(signal.SIGTERM)
+    await runner
+
+if __name__ == "__main__":
+    asyncio.run(main())
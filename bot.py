@@ -14,16 +14,31 @@ from handlers.deposit import DepositHandler
 from handlers.balance import BalanceHandler
 from handlers.my_numbers import MyNumbersHandler
 from handlers.admin import AdminHandler
-from handlers.messages import MessageHandler
+from handlers.messages import MessageHandler as TextMessageHandler
 
 # Import config
-from config import BOT_TOKEN, ADMIN_IDS, UPI_ID
+from config import BOT_TOKEN, ADMIN_IDS, UPI_ID, DEBUG_MODE, SLOW_CALLBACK_MS, QUERY_PROFILE_FILE
+from config import WEBHOOK_URL, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
 from utils.logger import logger
 from services.cleanup import CleanupService
+from database.db import db
+from database.inventory import inventory
+from database.reservations import account_queue
+from database.ledger import LedgerDB
+from database.utrs import seen_utrs
+from services.expiry import expiry_scheduler
+from services.client_pool import client_pool
+from services.otp import otp_pipeline
+from services.webhook import WebhookServer
+from utils.loop_monitor import BlockingCallMonitor
+import asyncio
+import secrets
+import signal
 
 class VirtualNumbersBot:
     def __init__(self):
         self.application = None
+        self.loop_monitor = BlockingCallMonitor(SLOW_CALLBACK_MS) if DEBUG_MODE else None
     
     def setup_handlers(self):
         """Setup all bot handlers"""
@@ -32,6 +47,12 @@ class VirtualNumbersBot:
         self.application.add_handler(CommandHandler("start", StartHandler.handle_start))
         self.application.add_handler(CommandHandler("help", self.handle_help))
         self.application.add_handler(CommandHandler("admin", self.handle_admin_command))
+        # Imports run for as long as the file takes; block=False keeps them
+        # from holding up the updates queued behind them
+        self.application.add_handler(CommandHandler("importutr", AdminHandler.handle_import_utr, block=False))
+        self.application.add_handler(CommandHandler("importnumbers", AdminHandler.handle_import_numbers, block=False))
+        self.application.add_handler(CommandHandler("importsessions", AdminHandler.handle_import_sessions, block=False))
+        self.application.add_handler(CommandHandler("querystats", AdminHandler.handle_query_stats))
         
         # Callback query handlers
         self.application.add_handler(CallbackQueryHandler(MenuHandler.handle_main_menu, pattern="^main_menu$"))
@@ -57,7 +78,7 @@ class VirtualNumbersBot:
         self.application.add_handler(CallbackQueryHandler(AdminHandler.handle_countries_list, pattern="^admin_countries$"))
         
         # Message handler
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, MessageHandler.handle_message))
+        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, TextMessageHandler.handle_message))
         
         logger.info("All handlers setup completed")
     
@@ -97,13 +118,89 @@ class VirtualNumbersBot:
         else:
             await update.message.reply_text("❌ Access denied.")
     
+    async def on_startup(self, application: Application):
+        """Open the database and warm the in-memory indexes"""
+        if self.loop_monitor:
+            # Every handler awaits the database; anything that still
+            # blocks the loop shows up here
+            self.loop_monitor.install()
+        await db.connect()
+        await LedgerDB.seed_snapshots()
+        await inventory.load()
+        await account_queue.load()
+        await seen_utrs.load()
+        await CleanupService.start_scheduler()
+        
+        # Route OTPs for orders that were active before a restart
+        client_pool.on_start(otp_pipeline.attach)
+        otp_pipeline.start(application.bot)
+        for account_id in await otp_pipeline.load():
+            client_pool.warm(account_id)
+    
+    async def on_shutdown(self, application: Application):
+        """Stop background tasks, flush pending writes and close the database"""
+        await expiry_scheduler.stop()
+        await otp_pipeline.stop()
+        await client_pool.close()
+        await db.close()
+        if QUERY_PROFILE_FILE:
+            db.profiler.dump(QUERY_PROFILE_FILE)
+        if self.loop_monitor:
+            self.loop_monitor.uninstall()
+            logger.info(f"Blocking call report: {self.loop_monitor.stats()}")
+    
     async def cleanup_task(self, context: ContextTypes.DEFAULT_TYPE):
-        """Periodic cleanup task"""
+        """Periodic reconciliation sweep behind the expiry scheduler"""
         logger.info("Running cleanup task...")
-        result = CleanupService.run_cleanup()
+        result = await CleanupService.run_cleanup()
         if result:
             logger.info(f"Cleanup completed: {result}")
     
+    async def snapshot_balances_task(self, context: ContextTypes.DEFAULT_TYPE):
+        """Fold new ledger entries into the balance snapshots"""
+        await LedgerDB.snapshot()
+    
+    async def evict_idle_clients_task(self, context: ContextTypes.DEFAULT_TYPE):
+        """Disconnect account clients that have been idle too long"""
+        evicted = await client_pool.evict_idle()
+        if evicted:
+            logger.info(f"Evicted {evicted} idle account clients: {client_pool.stats()}")
+    
+    async def run_webhook(self):
+        """Serve updates from the embedded webhook server until stopped"""
+        # Without a configured secret every run registers a fresh one, so
+        # only Telegram can post updates
+        secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        server = WebhookServer(self.application, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, secret_token)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass  # Windows: Ctrl+C interrupts asyncio.run instead
+        
+        # Same lifecycle run_polling drives, with our server in place of the updater
+        await self.application.initialize()
+        try:
+            await self.on_startup(self.application)
+            await self.application.start()
+            await server.start()
+            await self.application.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                allowed_updates=Update.ALL_TYPES,
+                secret_token=secret_token
+            )
+            print(f"🚀 Bot is running on webhook {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}. Press Ctrl+C to stop.")
+            await stop.wait()
+        finally:
+            await server.stop()
+            logger.info(f"Webhook report: {server.stats()}")
+            if self.application.running:
+                await self.application.stop()
+            await self.application.shutdown()
+            await self.on_shutdown(self.application)
+    
     def run(self):
         """Run the bot"""
         # Check if bot token is set
@@ -113,7 +210,16 @@ class VirtualNumbersBot:
             return
         
         # Create application
-        self.application = Application.builder().token(BOT_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .post_init(self.on_startup)
+            .post_shutdown(self.on_shutdown)
+        )
+        if WEBHOOK_URL:
+            # Updates arrive through WebhookServer, not getUpdates
+            builder = builder.updater(None)
+        self.application = builder.build()
         
         # Setup handlers
         self.setup_handlers()
@@ -121,22 +227,33 @@ class VirtualNumbersBot:
         # Setup periodic cleanup
         job_queue = self.application.job_queue
         if job_queue:
-            from config import NUMBER_EXPIRY_CHECK_INTERVAL
+            from config import CLEANUP_INTERVAL, LEDGER_SNAPSHOT_INTERVAL
             job_queue.run_repeating(
                 self.cleanup_task,
-                interval=NUMBER_EXPIRY_CHECK_INTERVAL,
+                interval=CLEANUP_INTERVAL,
                 first=10
             )
-            logger.info(f"Cleanup scheduled every {NUMBER_EXPIRY_CHECK_INTERVAL} seconds")
-        
-        # Initialize database
-        from database.db import db
-        logger.info("Database initialized")
+            logger.info(f"Cleanup scheduled every {CLEANUP_INTERVAL} seconds")
+            
+            job_queue.run_repeating(self.evict_idle_clients_task, interval=60, first=60)
+            job_queue.run_repeating(
+                self.snapshot_balances_task,
+                interval=LEDGER_SNAPSHOT_INTERVAL,
+                first=LEDGER_SNAPSHOT_INTERVAL
+            )
         
         # Start the bot
         logger.info("🤖 Bot starting...")
         print(f"👑 Admin IDs: {ADMIN_IDS}")
         print(f"💰 UPI ID: {UPI_ID}")
-        print("🚀 Bot is running. Press Ctrl+C to stop.")
         
-       
\ No newline at end of file
+        if WEBHOOK_URL:
+            asyncio.run(self.run_webhook())
+            return
+        
+        print("🚀 Bot is running. Press Ctrl+C to stop.")
+        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+if __name__ == "__main__":
+    bot = VirtualNumbersBot()
+    bot.run()
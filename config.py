@@ -6,6 +6,13 @@ BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 API_ID = int(os.getenv("API_ID", 0))
 API_HASH = os.getenv("API_HASH", "")
 
+# Webhook (updates are long-polled when WEBHOOK_URL is empty)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public HTTPS base URL Telegram posts to
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")  # plain HTTP: keep behind the TLS proxy
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # Telegram's secret token header; random per run if empty
+
 # Admin Configuration
 ADMIN_IDS: List[int] = []
 try:
@@ -18,6 +25,8 @@ except:
 # Payment Configuration
 UPI_ID = os.getenv("UPI_ID", "")
 MIN_DEPOSIT = int(os.getenv("MIN_DEPOSIT", 100))
+PAYMENT_TIMEOUT = int(os.getenv("PAYMENT_TIMEOUT", 1800))  # 30 minutes in seconds
+QR_WORKERS = int(os.getenv("QR_WORKERS", 2))  # threads rendering QR codes
 
 # Number Configuration
 NUMBER_DURATION = int(os.getenv("NUMBER_DURATION", 600))  # 10 minutes in seconds
@@ -25,13 +34,68 @@ NUMBER_PRICE = int(os.getenv("NUMBER_PRICE", 50))  # Default price in INR
 
 # Database
 DB_NAME = os.getenv("DB_NAME", "virtual_numbers.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 4))  # reader connections
+DB_COMMIT_WINDOW_MS = float(os.getenv("DB_COMMIT_WINDOW_MS", 3))  # max time a batch keeps collecting arriving writes
+DB_COMMIT_MAX_BATCH = int(os.getenv("DB_COMMIT_MAX_BATCH", 64))  # statements per commit
+QUERY_PROFILE_WINDOW = int(os.getenv("QUERY_PROFILE_WINDOW", 1000))  # recent calls kept per statement for percentiles
+QUERY_PROFILE_FILE = os.getenv("QUERY_PROFILE_FILE", "")  # JSON query profile written at shutdown, if set
 
 # Cleanup
 CLEANUP_INTERVAL = int(os.getenv("CLEANUP_INTERVAL", 300))  # 5 minutes
+CLEANUP_CHUNK_SIZE = int(os.getenv("CLEANUP_CHUNK_SIZE", 500))  # rows per expiry statement
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))  # rows per bulk import transaction
+LEDGER_SNAPSHOT_INTERVAL = int(os.getenv("LEDGER_SNAPSHOT_INTERVAL", 600))  # seconds between balance snapshots
+
+# Caches
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))  # cached user rows
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))  # seconds
+
+# Keyboards
+KEYBOARD_CACHE_TTL = int(os.getenv("KEYBOARD_CACHE_TTL", 30))  # seconds
 
 # Regex patterns
 OTP_REGEX = r'\b\d{4,6}\b'
+OTP_QUEUE_SIZE = int(os.getenv("OTP_QUEUE_SIZE", 1000))  # pending account messages
+OTP_WORKERS = int(os.getenv("OTP_WORKERS", 4))  # OTP delivery workers
 UTR_REGEX = r'^[A-Za-z0-9]{10,20}$'
 
 # Session settings
 SESSION_FOLDER = "sessions/accounts"
+SESSION_IMPORT_WORKERS = int(os.getenv("SESSION_IMPORT_WORKERS", 8))  # threads reading and validating session files
+CLIENT_POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", 20))  # live account clients
+CLIENT_IDLE_TIMEOUT = int(os.getenv("CLIENT_IDLE_TIMEOUT", 600))  # seconds before an idle client stops
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "")
+
+# Debugging
+DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
+SLOW_CALLBACK_MS = int(os.getenv("SLOW_CALLBACK_MS", 100))  # event loop stalls reported in debug mode
+
+# Bot appearance
+BOT_NAME = os.getenv("BOT_NAME", "Virtual Numbers Bot")
+SUPPORT_CHAT = os.getenv("SUPPORT_USERNAME", "")
+
+WELCOME_MESSAGE = f"""
+**Welcome to {BOT_NAME}!** 👋
+
+Buy virtual numbers and receive OTPs right here in this chat.
+
+🛒 **Buy Number** - pick a country and get a number
+💰 **Deposit** - add balance with UPI
+📱 **My Numbers** - see your active numbers
+
+Choose an option below to get started.
+"""
+
+HELP_MESSAGE = """
+**🆘 Help**
+
+1. Deposit balance with **💰 Deposit** and pay to `{upi_id}`
+2. Send the UTR of your payment to get it credited
+3. Buy a number with **🛒 Buy Number**
+4. OTPs for the number are forwarded here automatically
+
+Need help? Contact {support_chat}
+"""
@@ -1,20 +1,83 @@
+import json
 from .db import db
-from typing import Optional, Dict, Any
+from .reservations import account_queue
+from .records import Account
+from typing import Optional, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Claim one specific account, only if it is still free
+CLAIM_ACCOUNT = db.prepare("accounts.claim_account", f"""UPDATE accounts
+    SET is_in_use = 1,
+        last_used = CURRENT_TIMESTAMP,
+        total_numbers_served = total_numbers_served + 1
+    WHERE account_id = ? AND is_active = 1 AND is_in_use = 0
+    RETURNING {Account.select()}""", Account)
+
+# Fallback when the queue is empty or stale: claim the best free account
+# straight from idx_accounts_free
+CLAIM_NEXT_ACCOUNT = db.prepare("accounts.claim_next_account", f"""UPDATE accounts
+    SET is_in_use = 1,
+        last_used = CURRENT_TIMESTAMP,
+        total_numbers_served = total_numbers_served + 1
+    WHERE account_id = (
+        SELECT account_id FROM accounts
+        WHERE is_active = 1 AND is_in_use = 0
+        ORDER BY last_used ASC, total_numbers_served ASC
+        LIMIT 1
+    ) AND is_in_use = 0
+    RETURNING {Account.select()}""", Account)
+
+ADD_ACCOUNT = db.prepare("accounts.add_account", """INSERT INTO accounts (session_string, phone_number)
+    VALUES (?, ?)
+    RETURNING account_id""", Account)
+
+STAGE_ACCOUNTS = db.prepare(
+    "accounts.stage_import", "INSERT INTO temp.import_accounts (session_string, phone_number) VALUES (?, ?)"
+)
+
+INSERT_STAGED_ACCOUNTS = db.prepare("accounts.add_many", """INSERT OR IGNORE INTO accounts (session_string, phone_number)
+    SELECT session_string, phone_number FROM temp.import_accounts WHERE true
+    RETURNING account_id, session_string""", Account)
+
+GET_FREE_ACCOUNT = db.prepare("accounts.get_free_account", f"""SELECT {Account.select()} FROM accounts
+    WHERE is_active = 1 AND is_in_use = 0
+    ORDER BY last_used ASC, total_numbers_served ASC
+    LIMIT 1""", Account)
+
+MARK_USED = db.prepare("accounts.mark_used", """UPDATE accounts
+    SET is_in_use = 1,
+        last_used = CURRENT_TIMESTAMP,
+        total_numbers_served = total_numbers_served + 1
+    WHERE account_id = ?""")
+
+MARK_FREE = db.prepare("accounts.mark_free", """UPDATE accounts SET is_in_use = 0 WHERE account_id = ?
+    RETURNING account_id, is_active, last_used, total_numbers_served""", Account)
+
+# The ids travel as one JSON array so the statement text never changes
+RELEASE_ACCOUNTS = db.prepare("accounts.release_accounts", """UPDATE accounts SET is_in_use = 0
+    WHERE account_id IN (SELECT value FROM json_each(?))
+    RETURNING account_id, is_active, last_used, total_numbers_served""", Account)
+
+GET_ACCOUNT = db.prepare("accounts.get_account", f"SELECT {Account.select()} FROM accounts WHERE account_id = ?", Account)
+
+DISABLE_ACCOUNT = db.prepare("accounts.disable_account", "UPDATE accounts SET is_active = 0 WHERE account_id = ?")
+
+ENABLE_ACCOUNT = db.prepare("accounts.enable_account", """UPDATE accounts SET is_active = 1 WHERE account_id = ?
+    RETURNING account_id, is_active, is_in_use, last_used, total_numbers_served""", Account)
+
+GET_ACCOUNTS_COUNT = db.prepare("accounts.get_accounts_count", "SELECT COUNT(*) FROM accounts")
+
+GET_ALL_ACCOUNTS = db.prepare("accounts.get_all_accounts", f"SELECT {Account.select()} FROM accounts ORDER BY account_id", Account)
+
 class AccountsDB:
     @staticmethod
     async def add_account(session_string: str, phone_number: str = None) -> bool:
         """Add a new session account"""
         try:
-            await db.execute(
-                """INSERT INTO accounts (session_string, phone_number) 
-                VALUES (?, ?)""",
-                (session_string, phone_number)
-            )
-            await db.conn.commit()
+            result = await db.write(ADD_ACCOUNT, (session_string, phone_number))
+            account_queue.push(result.rows[0]['account_id'])
             logger.info(f"Added account: {phone_number or 'No phone'}")
             return True
         except Exception as e:
@@ -22,33 +85,58 @@ class AccountsDB:
             return False
 
     @staticmethod
-    async def get_free_account() -> Optional[Dict[str, Any]]:
+    async def add_many(accounts: List[Tuple[str, Optional[str]]]) -> List[Account]:
+        """Insert (session_string, phone_number) pairs in one transaction, skipping known sessions"""
+        async with db.transaction() as conn:
+            await conn.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS import_accounts (
+                    session_string TEXT,
+                    phone_number TEXT
+                )"""
+            )
+            await db.run_many(conn, STAGE_ACCOUNTS, accounts)
+            rows = await db.run(conn, INSERT_STAGED_ACCOUNTS)
+            await conn.execute("DELETE FROM temp.import_accounts")
+        for row in rows:
+            account_queue.push(row['account_id'])
+        return rows
+
+    @staticmethod
+    async def get_free_account() -> Optional[Account]:
         """Get a free account that's not in use"""
         try:
-            row = await db.fetch_one(
-                """SELECT * FROM accounts 
-                WHERE is_active = 1 AND is_in_use = 0 
-                ORDER BY last_used ASC, total_numbers_served ASC 
-                LIMIT 1"""
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_FREE_ACCOUNT)
         except Exception as e:
             logger.error(f"Error getting free account: {e}")
             return None
 
+    @staticmethod
+    async def claim_account() -> Optional[Account]:
+        """Atomically reserve the least recently used free account"""
+        try:
+            while True:
+                entry = account_queue.pop()
+                if not entry:
+                    break
+                result = await db.write(CLAIM_ACCOUNT, (entry[2],))
+                if result.rows:
+                    return result.rows[0]
+
+            result = await db.write(CLAIM_NEXT_ACCOUNT)
+            if result.rows:
+                account_queue.discard(result.rows[0]['account_id'])
+                return result.rows[0]
+            return None
+        except Exception as e:
+            logger.error(f"Error claiming account: {e}")
+            return None
+
     @staticmethod
     async def mark_used(account_id: int) -> bool:
         """Mark account as in use"""
         try:
-            await db.execute(
-                """UPDATE accounts 
-                SET is_in_use = 1, 
-                    last_used = CURRENT_TIMESTAMP,
-                    total_numbers_served = total_numbers_served + 1 
-                WHERE account_id = ?""",
-                (account_id,)
-            )
-            await db.conn.commit()
+            await db.write(MARK_USED, (account_id,))
+            account_queue.discard(account_id)
             return True
         except Exception as e:
             logger.error(f"Error marking account used: {e}")
@@ -58,25 +146,38 @@ class AccountsDB:
     async def mark_free(account_id: int) -> bool:
         """Mark account as free"""
         try:
-            await db.execute(
-                "UPDATE accounts SET is_in_use = 0 WHERE account_id = ?",
-                (account_id,)
-            )
-            await db.conn.commit()
+            result = await db.write(MARK_FREE, (account_id,))
+            AccountsDB._requeue(result.rows)
             return True
         except Exception as e:
             logger.error(f"Error marking account free: {e}")
             return False
 
     @staticmethod
-    async def get_account(account_id: int) -> Optional[Dict[str, Any]]:
+    async def release_accounts(account_ids: list) -> bool:
+        """Mark several accounts as free in one statement"""
+        if not account_ids:
+            return True
+        try:
+            result = await db.write(RELEASE_ACCOUNTS, (json.dumps(account_ids),))
+            AccountsDB._requeue(result.rows)
+            return True
+        except Exception as e:
+            logger.error(f"Error releasing accounts: {e}")
+            return False
+
+    @staticmethod
+    def _requeue(rows: list):
+        """Offer freed accounts back to the reservation queue"""
+        for row in rows:
+            if row['is_active']:
+                account_queue.push(row['account_id'], row['last_used'], row['total_numbers_served'])
+
+    @staticmethod
+    async def get_account(account_id: int) -> Optional[Account]:
         """Get account by ID"""
         try:
-            row = await db.fetch_one(
-                "SELECT * FROM accounts WHERE account_id = ?",
-                (account_id,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_ACCOUNT, (account_id,))
         except Exception as e:
             logger.error(f"Error getting account: {e}")
             return None
@@ -85,11 +186,8 @@ class AccountsDB:
     async def disable_account(account_id: int) -> bool:
         """Disable an account"""
         try:
-            await db.execute(
-                "UPDATE accounts SET is_active = 0 WHERE account_id = ?",
-                (account_id,)
-            )
-            await db.conn.commit()
+            await db.write(DISABLE_ACCOUNT, (account_id,))
+            account_queue.discard(account_id)
             return True
         except Exception as e:
             logger.error(f"Error disabling account: {e}")
@@ -99,24 +197,29 @@ class AccountsDB:
     async def enable_account(account_id: int) -> bool:
         """Enable an account"""
         try:
-            await db.execute(
-                "UPDATE accounts SET is_active = 1 WHERE account_id = ?",
-                (account_id,)
-            )
-            await db.conn.commit()
+            result = await db.write(ENABLE_ACCOUNT, (account_id,))
+            if result.rows and not result.rows[0]['is_in_use']:
+                AccountsDB._requeue(result.rows)
             return True
         except Exception as e:
             logger.error(f"Error enabling account: {e}")
             return False
 
     @staticmethod
-    async def get_all_accounts() -> list:
+    async def get_accounts_count() -> int:
+        """Get the number of accounts"""
+        try:
+            row = await db.fetch_one(GET_ACCOUNTS_COUNT)
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"Error counting accounts: {e}")
+            return 0
+
+    @staticmethod
+    async def get_all_accounts() -> List[Account]:
         """Get all accounts"""
         try:
-            rows = await db.fetch_all(
-                "SELECT * FROM accounts ORDER BY account_id"
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_ALL_ACCOUNTS)
         except Exception as e:
             logger.error(f"Error getting all accounts: {e}")
             return []
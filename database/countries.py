@@ -1,21 +1,48 @@
 from .db import db
-from typing import Optional, Dict, Any, List
+from .inventory import inventory
+from .records import Country
+from typing import Optional, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+ADD_COUNTRY = db.prepare("countries.add_country", """INSERT OR REPLACE INTO countries
+    (country_code, country_name, price)
+    VALUES (?, ?, ?)""")
+
+GET_COUNTRY = db.prepare("countries.get_country", f"""SELECT {Country.select()} FROM countries
+    WHERE country_code = ? AND is_active = 1""", Country)
+
+GET_PRICE = db.prepare("countries.get_price", "SELECT price FROM countries WHERE country_code = ? AND is_active = 1")
+
+GET_ALL_COUNTRIES = db.prepare("countries.get_all_countries", f"""SELECT {Country.select()} FROM countries
+    WHERE is_active = 1 ORDER BY country_name""", Country)
+
+GET_COUNTRIES_COUNT = db.prepare("countries.get_countries_count", "SELECT COUNT(*) FROM countries WHERE is_active = 1")
+
+# Fallback for when the inventory index is not loaded
+GET_COUNTRIES_WITH_STOCK = db.prepare("countries.get_countries_with_stock", """SELECT c.country_code, c.country_name, c.price,
+        COUNT(n.number_id) AS available
+    FROM countries c
+    LEFT JOIN numbers n
+        ON n.country_code = c.country_code AND n.is_assigned = 0
+    WHERE c.is_active = 1
+    GROUP BY c.country_id
+    ORDER BY c.country_name""", Country)
+
+ENABLE_COUNTRY = db.prepare("countries.enable_country", "UPDATE countries SET is_active = 1 WHERE country_code = ?")
+
+DISABLE_COUNTRY = db.prepare("countries.disable_country", "UPDATE countries SET is_active = 0 WHERE country_code = ?")
+
+UPDATE_PRICE = db.prepare("countries.update_price", "UPDATE countries SET price = ? WHERE country_code = ?")
+
 class CountriesDB:
     @staticmethod
     async def add_country(country_code: str, country_name: str, price: int) -> bool:
         """Add a new country"""
         try:
-            await db.execute(
-                """INSERT OR REPLACE INTO countries 
-                (country_code, country_name, price) 
-                VALUES (?, ?, ?)""",
-                (country_code, country_name, price)
-            )
-            await db.conn.commit()
+            await db.write(ADD_COUNTRY, (country_code, country_name, price))
+            inventory.notify(country_code)
             logger.info(f"Added country: {country_name} ({country_code}) - ₹{price}")
             return True
         except Exception as e:
@@ -23,36 +50,54 @@ class CountriesDB:
             return False
 
     @staticmethod
-    async def get_country(country_code: str) -> Optional[Dict[str, Any]]:
+    async def get_country(country_code: str) -> Optional[Country]:
         """Get country by code"""
         try:
-            row = await db.fetch_one(
-                "SELECT * FROM countries WHERE country_code = ? AND is_active = 1",
-                (country_code,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_COUNTRY, (country_code,))
         except Exception as e:
             logger.error(f"Error getting country: {e}")
             return None
 
     @staticmethod
-    async def get_all_countries() -> List[Dict[str, Any]]:
+    async def get_all_countries() -> List[Country]:
         """Get all active countries"""
         try:
-            rows = await db.fetch_all(
-                "SELECT * FROM countries WHERE is_active = 1 ORDER BY country_name"
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_ALL_COUNTRIES)
         except Exception as e:
             logger.error(f"Error getting countries: {e}")
             return []
 
+    @staticmethod
+    async def get_countries_with_stock() -> List[Country]:
+        """Get all active countries with price and available number count"""
+        try:
+            if not inventory.loaded:
+                return await db.fetch_all(GET_COUNTRIES_WITH_STOCK)
+            # The inventory index keeps the counts; only the listing is read
+            countries = await db.fetch_all(GET_ALL_COUNTRIES)
+            for country in countries:
+                country.available = inventory.available_count(country.country_code)
+            return countries
+        except Exception as e:
+            logger.error(f"Error getting countries with stock: {e}")
+            return []
+
+    @staticmethod
+    async def get_countries_count() -> int:
+        """Get the number of active countries"""
+        try:
+            row = await db.fetch_one(GET_COUNTRIES_COUNT)
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"Error counting countries: {e}")
+            return 0
+
     @staticmethod
     async def get_price(country_code: str) -> Optional[int]:
         """Get price for a country"""
         try:
-            country = await CountriesDB.get_country(country_code)
-            return country['price'] if country else None
+            row = await db.fetch_one(GET_PRICE, (country_code,))
+            return row[0] if row else None
         except Exception as e:
             logger.error(f"Error getting price: {e}")
             return None
@@ -61,11 +106,8 @@ class CountriesDB:
     async def enable_country(country_code: str) -> bool:
         """Enable a country"""
         try:
-            await db.execute(
-                "UPDATE countries SET is_active = 1 WHERE country_code = ?",
-                (country_code,)
-            )
-            await db.conn.commit()
+            await db.write(ENABLE_COUNTRY, (country_code,))
+            inventory.notify(country_code)
             return True
         except Exception as e:
             logger.error(f"Error enabling country: {e}")
@@ -75,11 +117,8 @@ class CountriesDB:
     async def disable_country(country_code: str) -> bool:
         """Disable a country"""
         try:
-            await db.execute(
-                "UPDATE countries SET is_active = 0 WHERE country_code = ?",
-                (country_code,)
-            )
-            await db.conn.commit()
+            await db.write(DISABLE_COUNTRY, (country_code,))
+            inventory.notify(country_code)
             return True
         except Exception as e:
             logger.error(f"Error disabling country: {e}")
@@ -89,11 +128,8 @@ class CountriesDB:
     async def update_price(country_code: str, price: int) -> bool:
         """Update country price"""
         try:
-            await db.execute(
-                "UPDATE countries SET price = ? WHERE country_code = ?",
-                (price, country_code)
-            )
-            await db.conn.commit()
+            await db.write(UPDATE_PRICE, (price, country_code))
+            inventory.notify(country_code)
             return True
         except Exception as e:
             logger.error(f"Error updating price: {e}")
@@ -1,124 +1,310 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
 import aiosqlite
-from config import DB_NAME
+from .migrations import migrate, check_query_plans
+from .profiler import QueryProfiler
+from .records import row_factory
+from config import DB_NAME, DB_POOL_SIZE, DB_COMMIT_WINDOW_MS, DB_COMMIT_MAX_BATCH
 import logging
 
 logger = logging.getLogger(__name__)
 
+class WriteResult(NamedTuple):
+    """Outcome of a single statement committed through Database.write"""
+    lastrowid: Optional[int]
+    rowcount: int
+    rows: List[Any]
+
+class Statement(NamedTuple):
+    """A named SQL statement registered with Database.prepare"""
+    name: str
+    sql: str
+    # Record class its rows are built as (None keeps aiosqlite.Row)
+    record: Optional[type] = None
+
+Query = Union[str, Statement]
+
+def _query(query: Query) -> Statement:
+    """Normalise a query to a Statement"""
+    if isinstance(query, Statement):
+        return query
+    # Ad-hoc SQL is profiled under its (abbreviated) text
+    return Statement(" ".join(query.split())[:60], query)
+
+def _use_records(cursor, record: Optional[type]):
+    """Build the cursor's rows as `record` objects instead of aiosqlite.Row"""
+    if record is not None and cursor.description:
+        cursor.row_factory = row_factory(record, cursor.description)
+
+def _row_count(cursor, rows: list) -> int:
+    return len(rows) if rows else max(cursor.rowcount, 0)
+
 class Database:
-    def __init__(self):
+    def __init__(self, pool_size: int = DB_POOL_SIZE):
         self.db_name = DB_NAME
-        self.conn = None
+        self.pool_size = max(1, pool_size)
+        self.conn = None  # single writer connection
+        self._readers = []
+        self._idle_readers = None
+        self._waiting = 0
+        self._acquired = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        # Group commit
+        self.commit_window = DB_COMMIT_WINDOW_MS / 1000
+        self.commit_max_batch = max(1, DB_COMMIT_MAX_BATCH)
+        self._write_queue = None
+        self._write_lock = None
+        self._flusher = None
+        self._batches = 0
+        self._batched_writes = 0
+
+        # Named statements and their latency profile
+        self.statements: Dict[str, str] = {}
+        self.profiler = QueryProfiler()
+
+    def prepare(self, name: str, sql: str, record: type = None) -> Statement:
+        """Register a statement once under a unique name"""
+        registered = self.statements.setdefault(name, sql)
+        if registered != sql:
+            raise ValueError(f"Statement {name} is already registered with different SQL")
+        return Statement(name, sql, record)
+
+    async def _open(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open a connection with the shared pragmas applied"""
+        # Registered statements always send the same text, so sqlite3's
+        # per-connection cache keeps each one compiled
+        conn = await aiosqlite.connect(self.db_name, cached_statements=max(128, 2 * len(self.statements)))
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA busy_timeout = 5000")
+        if read_only:
+            await conn.execute("PRAGMA query_only = 1")
+        return conn
 
     async def connect(self):
-        """Connect to SQLite database"""
-        self.conn = await aiosqlite.connect(self.db_name)
-        self.conn.row_factory = aiosqlite.Row
+        """Open the writer connection in WAL mode plus the reader pool"""
+        # Loop-bound, like the queues below: made per connect
+        self._write_lock = asyncio.Lock()
+        self.conn = await self._open()
+        await self.conn.execute("PRAGMA journal_mode = WAL")
         await self.init_tables()
-        logger.info(f"Connected to database: {self.db_name}")
+
+        self._idle_readers = asyncio.Queue()
+        for _ in range(self.pool_size):
+            reader = await self._open(read_only=True)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
+        self._write_queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self._flush_writes())
+        logger.info(f"Connected to database: {self.db_name} (1 writer, {self.pool_size} readers)")
 
     async def close(self):
-        """Close database connection"""
+        """Flush pending writes, then close writer and reader connections"""
+        if self._flusher:
+            await self._write_queue.join()
+            self._flusher.cancel()
+            self._flusher = None
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
         if self.conn:
             await self.conn.close()
+            self.conn = None
             logger.info("Database connection closed")
 
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a reader connection, recording how long we waited for it"""
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            conn = await self._idle_readers.get()
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._acquired += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Reader pool size and wait-time metrics"""
+        idle = self._idle_readers.qsize() if self._idle_readers else 0
+        return {
+            'pool_size': self.pool_size,
+            'idle': idle,
+            'in_use': len(self._readers) - idle,
+            'waiting': self._waiting,
+            'acquired': self._acquired,
+            'avg_wait_ms': (self._total_wait / self._acquired * 1000) if self._acquired else 0.0,
+            'max_wait_ms': self._max_wait * 1000,
+        }
+
     async def init_tables(self):
-        """Initialize all tables"""
-        await self.conn.executescript('''
-            -- Users table
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                balance INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_banned INTEGER DEFAULT 0,
-                total_spent INTEGER DEFAULT 0,
-                total_numbers INTEGER DEFAULT 0
-            );
-
-            -- Countries table
-            CREATE TABLE IF NOT EXISTS countries (
-                country_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                country_code TEXT UNIQUE,
-                country_name TEXT,
-                price INTEGER DEFAULT 50,
-                is_active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            -- Session accounts table
-            CREATE TABLE IF NOT EXISTS accounts (
-                account_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_string TEXT UNIQUE,
-                phone_number TEXT,
-                is_active INTEGER DEFAULT 1,
-                is_in_use INTEGER DEFAULT 0,
-                last_used TIMESTAMP,
-                total_numbers_served INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            -- Virtual numbers table
-            CREATE TABLE IF NOT EXISTS numbers (
-                number_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                country_code TEXT,
-                phone_number TEXT UNIQUE,
-                is_assigned INTEGER DEFAULT 0,
-                assigned_to INTEGER,
-                assigned_at TIMESTAMP,
-                expires_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (assigned_to) REFERENCES users(user_id)
-            );
-
-            -- Payments table
-            CREATE TABLE IF NOT EXISTS payments (
-                payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                amount INTEGER,
-                utr TEXT UNIQUE,
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP,
-                verified_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            );
-
-            -- Orders table
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                number_id INTEGER,
-                account_id INTEGER,
-                otp_code TEXT,
-                price INTEGER,
-                status TEXT DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                FOREIGN KEY (number_id) REFERENCES numbers(number_id),
-                FOREIGN KEY (account_id) REFERENCES accounts(account_id)
-            );
-        ''')
-        await self.conn.commit()
-        logger.info("Database tables initialized")
-
-    async def execute(self, query: str, params: tuple = ()):
-        """Execute a query"""
-        return await self.conn.execute(query, params)
-
-    async def fetch_one(self, query: str, params: tuple = ()):
-        """Fetch one row"""
-        cursor = await self.conn.execute(query, params)
-        row = await cursor.fetchone()
-        await cursor.close()
-        return row
+        """Bring the schema up to date and check the hot query plans"""
+        version = await migrate(self.conn)
+        for problem in await check_query_plans(self.conn, self.statements):
+            logger.warning(f"Hot query scans a table: {problem}")
+        logger.info(f"Database schema at version {version}")
+
+    async def write(self, query: Query, params: tuple = ()) -> WriteResult:
+        """Queue a write and wait until the batch containing it is committed"""
+        statement = _query(query)
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((statement, params, future))
+        result = await future
+        # Includes the commit window: that is the latency callers see
+        self.profiler.record(statement.name, time.perf_counter() - started, len(result.rows) or max(result.rowcount, 0))
+        return result
+
+    async def _flush_writes(self):
+        """Commit queued writes together, lingering up to commit_window only while more keep arriving"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self.commit_window
+            # A lone write commits at once. Writes queued meanwhile (e.g.
+            # during the previous commit) join the batch, and we keep
+            # yielding to collect more only while new ones show up.
+            arrived = False
+            while len(batch) < self.commit_max_batch:
+                if not self._write_queue.empty():
+                    batch.append(self._write_queue.get_nowait())
+                    arrived = True
+                    continue
+                if not arrived or loop.time() >= deadline:
+                    break
+                arrived = False
+                await asyncio.sleep(0)
+
+            try:
+                await self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f"Group commit failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    async def _commit_batch(self, batch: list):
+        """Run a batch of writes in one transaction and resolve each caller"""
+        results = []
+        async with self._write_lock:
+            await self.conn.execute("BEGIN")
+            try:
+                for statement, params, _ in batch:
+                    try:
+                        cursor = await self.conn.execute(statement.sql, params)
+                        _use_records(cursor, statement.record)
+                        rows = await cursor.fetchall()
+                        results.append(WriteResult(cursor.lastrowid, cursor.rowcount, rows))
+                        await cursor.close()
+                    except Exception as e:
+                        # A failed statement is undone on its own; only a lost
+                        # transaction takes the earlier writes with it.
+                        if not self.conn.in_transaction:
+                            raise
+                        results.append(e)
+                await self.conn.commit()
+            except BaseException:
+                # Never leave the writer inside a transaction: the next
+                # BEGIN would fail and take every later batch down with it
+                if self.conn.in_transaction:
+                    await self.conn.rollback()
+                raise
+
+        self._batches += 1
+        self._batched_writes += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run statements on the writer inside a BEGIN IMMEDIATE transaction"""
+        async with self._write_lock:
+            await self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            else:
+                await self.conn.commit()
 
-    async def fetch_all(self, query: str, params: tuple = ()):
-        """Fetch all rows"""
-        cursor = await self.conn.execute(query, params)
+    def get_commit_stats(self) -> Dict[str, Any]:
+        """Group commit batch metrics"""
+        return {
+            'batches': self._batches,
+            'writes': self._batched_writes,
+            'avg_batch_size': (self._batched_writes / self._batches) if self._batches else 0.0,
+            'queued': self._write_queue.qsize() if self._write_queue else 0,
+        }
+
+    async def execute(self, query: Query, params: tuple = ()):
+        """Execute a query on the writer connection"""
+        return await self.conn.execute(_query(query).sql, params)
+
+    async def run(self, conn: aiosqlite.Connection, query: Query, params: tuple = ()) -> list:
+        """Run a statement on a held connection (e.g. inside transaction()) and return its rows"""
+        name, sql, record = _query(query)
+        started = time.perf_counter()
+        cursor = await conn.execute(sql, params)
+        _use_records(cursor, record)
         rows = await cursor.fetchall()
+        self.profiler.record(name, time.perf_counter() - started, _row_count(cursor, rows))
+        await cursor.close()
+        return rows
+
+    async def run_many(self, conn: aiosqlite.Connection, query: Query, seq_of_params) -> int:
+        """Run a statement for each parameter tuple on a held connection"""
+        name, sql, _ = _query(query)
+        started = time.perf_counter()
+        cursor = await conn.executemany(sql, seq_of_params)
+        rowcount = max(cursor.rowcount, 0)
+        self.profiler.record(name, time.perf_counter() - started, rowcount)
         await cursor.close()
+        return rowcount
+
+    async def fetch_one(self, query: Query, params: tuple = ()):
+        """Fetch one row from a pooled reader"""
+        name, sql, record = _query(query)
+        async with self.reader() as conn:
+            started = time.perf_counter()
+            cursor = await conn.execute(sql, params)
+            _use_records(cursor, record)
+            row = await cursor.fetchone()
+            self.profiler.record(name, time.perf_counter() - started, 1 if row else 0)
+            await cursor.close()
+        return row
+
+    async def fetch_all(self, query: Query, params: tuple = ()):
+        """Fetch all rows from a pooled reader"""
+        name, sql, record = _query(query)
+        async with self.reader() as conn:
+            started = time.perf_counter()
+            cursor = await conn.execute(sql, params)
+            _use_records(cursor, record)
+            rows = await cursor.fetchall()
+            self.profiler.record(name, time.perf_counter() - started, len(rows))
+            await cursor.close()
         return rows
 
 # Global database instance
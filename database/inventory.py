@@ -0,0 +1,88 @@
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+from .db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOAD_FREE_NUMBERS = db.prepare("inventory.load", "SELECT number_id, country_code FROM numbers WHERE is_assigned = 0")
+
+class InventoryIndex:
+    """In-process mirror of free numbers per country.
+
+    Each country keeps a list of free number ids plus a position map so
+    counts, random picks, adds and removals are all O(1).
+    """
+
+    def __init__(self):
+        self._free: Dict[str, List[int]] = {}
+        self._where: Dict[int, Tuple[str, int]] = {}
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self.loaded = False
+
+    async def load(self):
+        """Rebuild the index from the numbers table"""
+        rows = await db.fetch_all(LOAD_FREE_NUMBERS)
+        self._free = {}
+        self._where = {}
+        for row in rows:
+            self._insert(row['country_code'], row['number_id'])
+        self.loaded = True
+        self.notify()
+        logger.info(f"Inventory loaded: {len(self._where)} free numbers in {len(self._free)} countries")
+
+    def _insert(self, country_code: str, number_id: int) -> bool:
+        if number_id in self._where:
+            return False
+        free = self._free.setdefault(country_code, [])
+        self._where[number_id] = (country_code, len(free))
+        free.append(number_id)
+        return True
+
+    def add(self, country_code: str, number_id: int):
+        """Mark a number as free"""
+        if self._insert(country_code, number_id):
+            self.notify(country_code)
+
+    def add_many(self, rows):
+        """Mark (country_code, number_id) pairs as free, notifying once per country"""
+        changed = {country_code for country_code, number_id in rows if self._insert(country_code, number_id)}
+        for country_code in changed:
+            self.notify(country_code)
+
+    def remove(self, number_id: int):
+        """Mark a number as taken"""
+        entry = self._where.pop(number_id, None)
+        if not entry:
+            return
+        country_code, index = entry
+        free = self._free[country_code]
+        last = free.pop()
+        if last != number_id:
+            free[index] = last
+            self._where[last] = (country_code, index)
+        self.notify(country_code)
+
+    def on_change(self, callback: Callable[[Optional[str]], None]):
+        """Register a callback fired when stock or a country's listing changes"""
+        self._listeners.append(callback)
+
+    def notify(self, country_code: Optional[str] = None):
+        """Tell listeners that a country (or everything, if None) changed"""
+        for callback in self._listeners:
+            try:
+                callback(country_code)
+            except Exception as e:
+                logger.error(f"Inventory listener failed: {e}")
+
+    def available_count(self, country_code: str) -> int:
+        """Number of free numbers for a country"""
+        return len(self._free.get(country_code, ()))
+
+    def random_free(self, country_code: str) -> Optional[int]:
+        """Pick a random free number id for a country"""
+        free = self._free.get(country_code)
+        return random.choice(free) if free else None
+
+# Global inventory index
+inventory = InventoryIndex()
@@ -0,0 +1,182 @@
+from .db import db
+from .records import User
+from typing import Optional, Dict, Any, Mapping, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ledger kinds. Deposits count towards total_deposits, purchases and
+# refunds towards total_spent (and purchases towards total_numbers);
+# adjustments only move the balance.
+DEPOSIT = 'deposit'
+PURCHASE = 'purchase'
+REFUND = 'refund'
+ADJUSTMENT = 'adjustment'
+SPEND_KINDS = (PURCHASE, REFUND)
+
+# Live totals (in paise) for one user: the latest snapshot plus the ledger
+# tail written after it. Returns no row for unknown users.
+TOTALS = db.prepare("ledger.totals", """SELECT u.user_id,
+        COALESCE(s.balance, 0) + COALESCE(SUM(l.amount), 0) AS balance,
+        COALESCE(s.total_deposits, 0)
+            + COALESCE(SUM(CASE WHEN l.kind = 'deposit' THEN l.amount END), 0) AS total_deposits,
+        COALESCE(s.total_spent, 0)
+            - COALESCE(SUM(CASE WHEN l.kind IN ('purchase', 'refund') THEN l.amount END), 0) AS total_spent,
+        COALESCE(s.total_numbers, 0) + COUNT(CASE WHEN l.kind = 'purchase' THEN 1 END) AS total_numbers
+    FROM users u
+    LEFT JOIN balance_snapshots s ON s.user_id = u.user_id
+    LEFT JOIN balance_ledger l
+        ON l.user_id = u.user_id AND l.entry_id > COALESCE(s.last_entry_id, 0)
+    WHERE u.user_id = ?
+    GROUP BY u.user_id""")
+
+def _live_total(expression: str) -> str:
+    """One TOTALS column for user ?1 as a scalar subquery"""
+    return f"""(SELECT {expression}
+        FROM (SELECT ?1 AS user_id) k
+        LEFT JOIN balance_snapshots s ON s.user_id = k.user_id
+        LEFT JOIN balance_ledger l
+            ON l.user_id = k.user_id AND l.entry_id > COALESCE(s.last_entry_id, 0))"""
+
+# TOTALS as columns of a RETURNING clause on users, for statements whose
+# first parameter is the user id (values in paise, like TOTALS)
+LIVE_TOTALS = ",\n    ".join(f"{_live_total(expression)} AS {column}" for column, expression in (
+    ('balance', "COALESCE(s.balance, 0) + COALESCE(SUM(l.amount), 0)"),
+    ('total_deposits', "COALESCE(s.total_deposits, 0)"
+        " + COALESCE(SUM(CASE WHEN l.kind = 'deposit' THEN l.amount END), 0)"),
+    ('total_spent', "COALESCE(s.total_spent, 0)"
+        " - COALESCE(SUM(CASE WHEN l.kind IN ('purchase', 'refund') THEN l.amount END), 0)"),
+    ('total_numbers', "COALESCE(s.total_numbers, 0) + COUNT(CASE WHEN l.kind = 'purchase' THEN 1 END)"),
+))
+
+# Append one entry, only for existing users
+RECORD = db.prepare("ledger.record", """INSERT INTO balance_ledger (user_id, amount, kind, ref_id)
+    SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM users WHERE user_id = ?)
+    RETURNING entry_id""")
+
+# Append one entry inside a transaction that already checked the user
+APPEND = db.prepare("ledger.append", """INSERT INTO balance_ledger (user_id, amount, kind, ref_id)
+    VALUES (?, ?, ?, ?)""")
+
+SEED_SNAPSHOTS = db.prepare("ledger.seed_snapshots", """INSERT OR IGNORE INTO balance_snapshots
+    (user_id, balance, total_deposits, total_spent, total_numbers, last_entry_id)
+    SELECT user_id, balance * 100, total_deposits * 100, total_spent * 100, total_numbers, 0
+    FROM users
+    WHERE user_id NOT IN (SELECT user_id FROM balance_snapshots)""")
+
+HIGH_WATER = db.prepare("ledger.high_water", "SELECT MAX(entry_id) FROM balance_ledger")
+
+FOLD_TAIL = db.prepare("ledger.snapshot", """INSERT INTO balance_snapshots
+    (user_id, balance, total_deposits, total_spent, total_numbers, last_entry_id, updated_at)
+    SELECT l.user_id,
+        SUM(l.amount),
+        COALESCE(SUM(CASE WHEN l.kind = 'deposit' THEN l.amount END), 0),
+        -COALESCE(SUM(CASE WHEN l.kind IN ('purchase', 'refund') THEN l.amount END), 0),
+        COUNT(CASE WHEN l.kind = 'purchase' THEN 1 END),
+        MAX(l.entry_id),
+        CURRENT_TIMESTAMP
+    FROM balance_ledger l
+    LEFT JOIN balance_snapshots s ON s.user_id = l.user_id
+    WHERE l.entry_id > COALESCE(s.last_entry_id, 0) AND l.entry_id <= ?
+    GROUP BY l.user_id
+    ON CONFLICT(user_id) DO UPDATE SET
+        balance = balance + excluded.balance,
+        total_deposits = total_deposits + excluded.total_deposits,
+        total_spent = total_spent + excluded.total_spent,
+        total_numbers = total_numbers + excluded.total_numbers,
+        last_entry_id = excluded.last_entry_id,
+        updated_at = excluded.updated_at
+    RETURNING user_id""")
+
+# Mirror the rupee totals onto the users rows in one pass
+MIRROR_SNAPSHOTS = db.prepare("ledger.mirror_snapshots", """UPDATE users
+    SET balance = s.balance / 100.0,
+        total_deposits = s.total_deposits / 100.0,
+        total_spent = s.total_spent / 100.0,
+        total_numbers = s.total_numbers
+    FROM balance_snapshots s
+    WHERE s.user_id = users.user_id
+        AND (users.balance IS NOT s.balance / 100.0
+            OR users.total_deposits IS NOT s.total_deposits / 100.0
+            OR users.total_spent IS NOT s.total_spent / 100.0
+            OR users.total_numbers IS NOT s.total_numbers)""")
+
+def to_paise(amount: Union[int, float]) -> int:
+    """Convert rupees to integer paise"""
+    return int(round(amount * 100))
+
+def from_paise(paise: int) -> Union[int, float]:
+    """Convert paise to rupees, keeping whole amounts as int"""
+    return paise // 100 if paise % 100 == 0 else paise / 100
+
+def to_user_fields(totals) -> Dict[str, Any]:
+    """Convert a paise totals row to the user-facing rupee fields"""
+    return {
+        'balance': from_paise(totals['balance']),
+        'total_deposits': from_paise(totals['total_deposits']),
+        'total_spent': from_paise(totals['total_spent']),
+        'total_numbers': totals['total_numbers'],
+    }
+
+def apply_entry(user: User, kind: str, amount: int):
+    """Apply a ledger entry (in paise) to a cached user's rupee totals"""
+    user['balance'] = from_paise(to_paise(user['balance']) + amount)
+    if kind == DEPOSIT:
+        user['total_deposits'] = from_paise(to_paise(user['total_deposits']) + amount)
+    elif kind in SPEND_KINDS:
+        user['total_spent'] = from_paise(to_paise(user['total_spent']) - amount)
+    if kind == PURCHASE:
+        user['total_numbers'] += 1
+
+class LedgerDB:
+    @staticmethod
+    async def record(user_id: int, amount: int, kind: str, ref_id: int = None) -> Optional[int]:
+        """Append a balance change in paise, returning its entry id"""
+        try:
+            result = await db.write(RECORD, (user_id, amount, kind, ref_id, user_id))
+            return result.rows[0]['entry_id'] if result.rows else None
+        except Exception as e:
+            logger.error(f"Error recording ledger entry: {e}")
+            return None
+
+    @staticmethod
+    async def get_totals(user_id: int) -> Optional[Mapping[str, int]]:
+        """Get live balance, deposits and spend for a user in paise"""
+        try:
+            # Read-only and short-lived: no need to copy the row
+            return await db.fetch_one(TOTALS, (user_id,))
+        except Exception as e:
+            logger.error(f"Error getting ledger totals: {e}")
+            return None
+
+    @staticmethod
+    async def seed_snapshots() -> int:
+        """Start a snapshot for users that have none from their stored totals"""
+        try:
+            result = await db.write(SEED_SNAPSHOTS)
+            if result.rowcount:
+                logger.info(f"Seeded {result.rowcount} balance snapshots")
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Error seeding balance snapshots: {e}")
+            return 0
+
+    @staticmethod
+    async def snapshot() -> int:
+        """Fold the ledger tail into the per-user snapshots"""
+        try:
+            async with db.transaction() as conn:
+                # Fix the high-water mark first so entries appended meanwhile
+                # stay in the tail for the next run
+                rows = await db.run(conn, HIGH_WATER)
+                high_water = rows[0][0] or 0
+
+                rows = await db.run(conn, FOLD_TAIL, (high_water,))
+                users = [row[0] for row in rows]
+                await db.run(conn, MIRROR_SNAPSHOTS)
+            if users:
+                logger.info(f"Snapshotted balances for {len(users)} users up to entry #{high_water}")
+            return len(users)
+        except Exception as e:
+            logger.error(f"Error snapshotting balances: {e}")
+            return 0
@@ -0,0 +1,318 @@
+from typing import Dict, List, NamedTuple, Optional
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    """One schema change, applied once and recorded in schema_version"""
+    version: int
+    name: str
+    script: str
+    # Query returning a row when the script is needed; None means always
+    applies: Optional[str] = None
+
+# The first schema (virtual_numbers.db as shipped) keyed users by an
+# autoincrement id next to telegram_id and kept numbers in virtual_numbers.
+# Its tables are moved aside here, the current schema is created next to
+# them, and import_legacy_data copies the rows over.
+LEGACY_TABLES = """
+    ALTER TABLE users RENAME TO legacy_users;
+    ALTER TABLE countries RENAME TO legacy_countries;
+    ALTER TABLE accounts RENAME TO legacy_accounts;
+    ALTER TABLE payments RENAME TO legacy_payments;
+    ALTER TABLE orders RENAME TO legacy_orders;
+"""
+
+BASELINE = """
+    -- Users table
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        balance INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_banned INTEGER DEFAULT 0,
+        total_deposits INTEGER DEFAULT 0,
+        total_spent INTEGER DEFAULT 0,
+        total_numbers INTEGER DEFAULT 0
+    );
+
+    -- Countries table
+    CREATE TABLE IF NOT EXISTS countries (
+        country_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        country_code TEXT UNIQUE,
+        country_name TEXT,
+        price INTEGER DEFAULT 50,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Session accounts table
+    CREATE TABLE IF NOT EXISTS accounts (
+        account_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_string TEXT UNIQUE,
+        phone_number TEXT,
+        is_active INTEGER DEFAULT 1,
+        is_in_use INTEGER DEFAULT 0,
+        last_used TIMESTAMP,
+        total_numbers_served INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_accounts_free
+        ON accounts(is_active, is_in_use, last_used, total_numbers_served);
+
+    -- Virtual numbers table
+    CREATE TABLE IF NOT EXISTS numbers (
+        number_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        country_code TEXT,
+        phone_number TEXT UNIQUE,
+        is_assigned INTEGER DEFAULT 0,
+        assigned_to INTEGER,
+        assigned_at TIMESTAMP,
+        expires_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assigned_to) REFERENCES users(user_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_numbers_country_free
+        ON numbers(country_code, is_assigned, number_id);
+    CREATE INDEX IF NOT EXISTS idx_numbers_expiry
+        ON numbers(is_assigned, expires_at);
+
+    -- Payments table
+    CREATE TABLE IF NOT EXISTS payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        amount INTEGER,
+        utr TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP,
+        verified_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_payments_expiry
+        ON payments(status, expires_at);
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_utr
+        ON payments(utr) WHERE utr IS NOT NULL;
+
+    -- Orders table
+    CREATE TABLE IF NOT EXISTS orders (
+        order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        number_id INTEGER,
+        account_id INTEGER,
+        otp_code TEXT,
+        price INTEGER,
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id),
+        FOREIGN KEY (number_id) REFERENCES numbers(number_id),
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_orders_expiry
+        ON orders(status, expires_at);
+
+    -- Append-only balance changes, in paise
+    CREATE TABLE IF NOT EXISTS balance_ledger (
+        entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        ref_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_ledger_user
+        ON balance_ledger(user_id, entry_id);
+
+    -- Per-user ledger totals up to last_entry_id, in paise
+    CREATE TABLE IF NOT EXISTS balance_snapshots (
+        user_id INTEGER PRIMARY KEY,
+        balance INTEGER DEFAULT 0,
+        total_deposits INTEGER DEFAULT 0,
+        total_spent INTEGER DEFAULT 0,
+        total_numbers INTEGER DEFAULT 0,
+        last_entry_id INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Databases created before the balance ledger
+USERS_TOTAL_DEPOSITS = """
+    ALTER TABLE users ADD COLUMN total_deposits INTEGER DEFAULT 0;
+"""
+
+# Legacy ids are kept for countries, accounts, numbers, payments and
+# orders; user references are rewritten to the Telegram id.
+IMPORT_LEGACY_DATA = """
+    INSERT INTO users
+        (user_id, username, balance, created_at, is_banned, total_deposits, total_spent, total_numbers)
+    SELECT u.telegram_id, u.username, u.balance, u.join_date, u.is_banned,
+        u.total_deposits, u.total_spent,
+        (SELECT COUNT(*) FROM legacy_orders o WHERE o.user_id = u.id)
+    FROM legacy_users u;
+
+    INSERT OR IGNORE INTO countries (country_id, country_code, country_name, is_active)
+    SELECT id, UPPER(COALESCE(code, name)), name, is_active FROM legacy_countries;
+
+    INSERT OR IGNORE INTO accounts
+        (account_id, session_string, phone_number, is_active, is_in_use, last_used, created_at)
+    SELECT id, session_string, phone_number, is_active, is_used, last_used, added_date
+    FROM legacy_accounts;
+
+    INSERT OR IGNORE INTO numbers
+        (number_id, country_code, phone_number, is_assigned, assigned_to, assigned_at, expires_at)
+    SELECT n.id, UPPER(COALESCE(c.code, c.name)), n.number,
+        COALESCE(n.status, 'available') != 'available',
+        u.telegram_id, n.purchase_date, n.expiry_date
+    FROM virtual_numbers n
+    LEFT JOIN legacy_countries c ON c.id = n.country_id
+    LEFT JOIN legacy_users u ON u.id = n.user_id;
+
+    -- Only the first payment keeps a repeated UTR (idx_payments_utr)
+    INSERT INTO payments
+        (payment_id, user_id, amount, utr, status, created_at, expires_at, verified_at)
+    SELECT p.id, u.telegram_id, p.amount,
+        CASE WHEN p.id = (SELECT MIN(d.id) FROM legacy_payments d WHERE d.utr = p.utr) THEN p.utr END,
+        CASE WHEN p.status IN ('verified', 'success', 'approved') THEN 'completed' ELSE p.status END,
+        p.created_at, p.expires_at, p.verified_at
+    FROM legacy_payments p
+    LEFT JOIN legacy_users u ON u.id = p.user_id;
+
+    INSERT INTO orders
+        (order_id, user_id, number_id, account_id, otp_code, price, status, created_at, expires_at)
+    SELECT o.id, u.telegram_id, o.number_id, n.account_id, o.otp_code, o.amount,
+        o.status, o.created_at, n.expiry_date
+    FROM legacy_orders o
+    LEFT JOIN legacy_users u ON u.id = o.user_id
+    LEFT JOIN virtual_numbers n ON n.id = o.number_id;
+
+    DROP TABLE legacy_orders;
+    DROP TABLE legacy_payments;
+    DROP TABLE virtual_numbers;
+    DROP TABLE legacy_accounts;
+    DROP TABLE legacy_countries;
+    DROP TABLE legacy_users;
+"""
+
+# Per-user lookups on the update path; the expiry, inventory and account
+# claim lookups are served by the baseline indexes
+HOT_PATH_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_orders_user_active
+        ON orders(user_id, status, expires_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_number
+        ON orders(number_id, status);
+    CREATE INDEX IF NOT EXISTS idx_numbers_user
+        ON numbers(assigned_to, is_assigned);
+    CREATE INDEX IF NOT EXISTS idx_payments_user
+        ON payments(user_id, created_at);
+"""
+
+MIGRATIONS = [
+    Migration(1, "legacy_tables", LEGACY_TABLES,
+              applies="SELECT 1 FROM pragma_table_info('users') WHERE name = 'telegram_id'"),
+    Migration(2, "baseline", BASELINE),
+    Migration(3, "users_total_deposits", USERS_TOTAL_DEPOSITS,
+              applies="""SELECT 1 WHERE NOT EXISTS (
+                  SELECT 1 FROM pragma_table_info('users') WHERE name = 'total_deposits')"""),
+    Migration(4, "import_legacy_data", IMPORT_LEGACY_DATA,
+              applies="SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'legacy_users'"),
+    Migration(5, "hot_path_indexes", HOT_PATH_INDEXES),
+]
+
+# Registered statements run for (nearly) every update or expiry sweep;
+# each must be answered from an index
+HOT_STATEMENTS = (
+    'users.get_user',
+    'users.register',
+    'ledger.totals',
+    'countries.get_price',
+    'numbers.get_available_numbers',
+    'numbers.probe_free_number',
+    'numbers.get_user_numbers',
+    'numbers.expire_due',
+    'purchase.claim_number',
+    'accounts.claim_next_account',
+    'orders.get_active_orders',
+    'orders.get_order_by_number',
+    'orders.update_otp',
+    'orders.expire_due',
+    'payments.get_payment',
+    'payments.complete',
+    'payments.get_user_payments',
+    'payments.get_pending_payments',
+    'payments.expire_due',
+)
+
+async def migrate(conn) -> int:
+    """Apply pending migrations in order, returning the schema version"""
+    await conn.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )"""
+    )
+    await conn.commit()
+    cursor = await conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    current = (await cursor.fetchone())[0]
+    await cursor.close()
+
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        script = migration.script
+        if migration.applies:
+            cursor = await conn.execute(migration.applies)
+            if not await cursor.fetchone():
+                script = ""
+            await cursor.close()
+
+        # The script and its version row commit together or not at all
+        try:
+            await conn.executescript(
+                f"BEGIN IMMEDIATE;\n{script}\n"
+                f"INSERT INTO schema_version (version, name) VALUES ({migration.version}, '{migration.name}');\n"
+                "COMMIT;"
+            )
+        except Exception as e:
+            if conn.in_transaction:
+                await conn.rollback()
+            logger.error(f"Migration {migration.version} ({migration.name}) failed: {e}")
+            raise
+        current = migration.version
+        logger.info(f"Applied migration {migration.version}: {migration.name}"
+                    + ("" if script else " (nothing to do)"))
+    return current
+
+async def check_query_plans(conn, statements: Dict[str, str]) -> List[str]:
+    """EXPLAIN QUERY PLAN every registered hot statement and list the ones that scan a table"""
+    problems = []
+    for name in HOT_STATEMENTS:
+        sql = statements.get(name)
+        if sql is None:
+            # Its module is not imported in this process
+            continue
+        numbered = [int(index) for index in re.findall(r"\?(\d+)", sql)]
+        params = (None,) * (max(numbered) if numbered else sql.count('?'))
+        cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        rows = await cursor.fetchall()
+        await cursor.close()
+        # Subqueries run as co-routines or materialized are scanned by name
+        subqueries = {row[3].split(" ", 1)[1] for row in rows
+                      if row[3].startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        for row in rows:
+            detail = row[3]
+            if not detail.startswith("SCAN ") or "USING" in detail or "VIRTUAL TABLE" in detail:
+                continue
+            target = detail[len("SCAN "):]
+            if target == "CONSTANT ROW" or target in subqueries:
+                continue
+            problems.append(f"{name}: {detail}")
+    return problems
@@ -1,23 +1,106 @@
 from .db import db
-from typing import Optional, Dict, Any
+from .inventory import inventory
+from .records import Number
+from services.expiry import expiry_scheduler
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from datetime import datetime, timedelta
 from config import NUMBER_DURATION
 
 logger = logging.getLogger(__name__)
 
+GENERATE_NUMBER = db.prepare("numbers.generate_number", """INSERT OR IGNORE INTO numbers
+    (country_code, phone_number)
+    VALUES (?, ?)
+    RETURNING number_id""", Number)
+
+STAGE_NUMBERS = db.prepare(
+    "numbers.stage_import", "INSERT INTO temp.import_numbers (country_code, phone_number) VALUES (?, ?)"
+)
+
+INSERT_STAGED_NUMBERS = db.prepare("numbers.insert_many", """INSERT OR IGNORE INTO numbers (country_code, phone_number)
+    SELECT country_code, phone_number FROM temp.import_numbers WHERE true
+    RETURNING number_id, country_code""", Number)
+
+GET_FREE_NUMBER = db.prepare("numbers.get_available_number", f"""SELECT {Number.select()} FROM numbers
+    WHERE number_id = ? AND is_assigned = 0""", Number)
+
+PROBE_FREE_NUMBER = db.prepare("numbers.probe_free_number", f"""SELECT {Number.select()} FROM numbers
+    WHERE country_code = ? AND is_assigned = 0 AND number_id >= (
+        SELECT lo + abs(random()) % (hi - lo + 1) FROM (
+            SELECT
+                (SELECT MIN(number_id) FROM numbers
+                 WHERE country_code = ? AND is_assigned = 0) AS lo,
+                (SELECT MAX(number_id) FROM numbers
+                 WHERE country_code = ? AND is_assigned = 0) AS hi
+        )
+    )
+    ORDER BY number_id LIMIT 1""", Number)
+
+# Only what the number picker shows
+GET_AVAILABLE_NUMBERS = db.prepare("numbers.get_available_numbers", """SELECT number_id, phone_number FROM numbers
+    WHERE country_code = ? AND is_assigned = 0
+    ORDER BY number_id LIMIT ?""", Number)
+
+GET_STATS = db.prepare("numbers.get_stats", """SELECT COUNT(*) AS total,
+        COALESCE(SUM(is_assigned = 0), 0) AS available
+    FROM numbers""")
+
+ASSIGN_NUMBER = db.prepare("numbers.assign_number", """UPDATE numbers
+    SET is_assigned = 1,
+        assigned_to = ?,
+        assigned_at = CURRENT_TIMESTAMP,
+        expires_at = ?
+    WHERE number_id = ?""")
+
+EXPIRE_NUMBER = db.prepare("numbers.expire_number", """UPDATE numbers
+    SET is_assigned = 0,
+        assigned_to = NULL,
+        assigned_at = NULL,
+        expires_at = NULL
+    WHERE number_id = ?
+    RETURNING country_code""", Number)
+
+GET_USER_NUMBERS = db.prepare("numbers.get_user_numbers", f"""SELECT {Number.select()} FROM numbers
+    WHERE assigned_to = ? AND is_assigned = 1
+    ORDER BY assigned_at DESC""", Number)
+
+GET_NUMBER = db.prepare("numbers.get_number", f"SELECT {Number.select()} FROM numbers WHERE number_id = ?", Number)
+
+RECYCLE_NUMBER = db.prepare("numbers.recycle_number", """UPDATE numbers
+    SET is_assigned = 0,
+        assigned_to = NULL,
+        assigned_at = NULL,
+        expires_at = NULL
+    WHERE number_id = ?
+    RETURNING country_code""", Number)
+
+GET_EXPIRED_NUMBERS = db.prepare("numbers.get_expired_numbers", f"""SELECT {Number.select()} FROM numbers
+    WHERE is_assigned = 1 AND expires_at <= datetime('now')""", Number)
+
+EXPIRE_DUE = db.prepare("numbers.expire_due", """UPDATE numbers
+    SET is_assigned = 0,
+        assigned_to = NULL,
+        assigned_at = NULL,
+        expires_at = NULL
+    WHERE number_id IN (
+        SELECT number_id FROM numbers
+        WHERE is_assigned = 1 AND expires_at <= ?
+        LIMIT ?
+    )
+    RETURNING number_id, country_code""", Number)
+
+GET_EXPIRY_DEADLINES = db.prepare("numbers.get_expiry_deadlines", """SELECT DISTINCT expires_at FROM numbers
+    WHERE is_assigned = 1 AND expires_at IS NOT NULL""")
+
 class NumbersDB:
     @staticmethod
     async def generate_number(country_code: str, phone_number: str) -> bool:
         """Generate a new virtual number"""
         try:
-            await db.execute(
-                """INSERT OR IGNORE INTO numbers 
-                (country_code, phone_number) 
-                VALUES (?, ?)""",
-                (country_code, phone_number)
-            )
-            await db.conn.commit()
+            result = await db.write(GENERATE_NUMBER, (country_code, phone_number))
+            if result.rows:
+                inventory.add(country_code, result.rows[0]['number_id'])
             logger.info(f"Generated number: {phone_number} ({country_code})")
             return True
         except Exception as e:
@@ -25,35 +108,68 @@ class NumbersDB:
             return False
 
     @staticmethod
-    async def get_available_number(country_code: str) -> Optional[Dict[str, Any]]:
+    async def insert_many(numbers: List[Tuple[str, str]]) -> int:
+        """Insert (country_code, phone_number) pairs in one transaction, skipping known numbers"""
+        async with db.transaction() as conn:
+            # Stage the chunk, then insert it with one set-based statement
+            # so the ids of the new rows come back for the inventory
+            await conn.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS import_numbers (
+                    country_code TEXT,
+                    phone_number TEXT
+                )"""
+            )
+            await db.run_many(conn, STAGE_NUMBERS, numbers)
+            rows = await db.run(conn, INSERT_STAGED_NUMBERS)
+            await conn.execute("DELETE FROM temp.import_numbers")
+        inventory.add_many((row['country_code'], row['number_id']) for row in rows)
+        return len(rows)
+
+    @staticmethod
+    async def get_available_number(country_code: str) -> Optional[Number]:
         """Get an available number for a country"""
         try:
-            row = await db.fetch_one(
-                """SELECT * FROM numbers 
-                WHERE country_code = ? AND is_assigned = 0 
-                ORDER BY RANDOM() LIMIT 1""",
-                (country_code,)
-            )
-            return dict(row) if row else None
+            number_id = inventory.random_free(country_code)
+            if number_id:
+                number = await db.fetch_one(GET_FREE_NUMBER, (number_id,))
+                if number:
+                    return number
+
+            # Probe the (country_code, is_assigned, number_id) index at a
+            # random id between the lowest and highest free number instead
+            # of sorting every free row by RANDOM().
+            return await db.fetch_one(PROBE_FREE_NUMBER, (country_code, country_code, country_code))
         except Exception as e:
             logger.error(f"Error getting available number: {e}")
             return None
 
+    @staticmethod
+    async def get_available_numbers(country_code: str, limit: int = 15) -> List[Number]:
+        """Get up to `limit` free numbers (id and phone number only) for a country"""
+        try:
+            return await db.fetch_all(GET_AVAILABLE_NUMBERS, (country_code, limit))
+        except Exception as e:
+            logger.error(f"Error getting available numbers: {e}")
+            return []
+
+    @staticmethod
+    async def get_stats() -> Dict[str, int]:
+        """Get total and available number counts"""
+        try:
+            row = await db.fetch_one(GET_STATS)
+            return dict(row) if row else {}
+        except Exception as e:
+            logger.error(f"Error getting number stats: {e}")
+            return {}
+
     @staticmethod
     async def assign_number(number_id: int, user_id: int) -> bool:
         """Assign number to user"""
         try:
             expires_at = datetime.now() + timedelta(seconds=NUMBER_DURATION)
-            await db.execute(
-                """UPDATE numbers 
-                SET is_assigned = 1, 
-                    assigned_to = ?,
-                    assigned_at = CURRENT_TIMESTAMP,
-                    expires_at = ? 
-                WHERE number_id = ?""",
-                (user_id, expires_at, number_id)
-            )
-            await db.conn.commit()
+            await db.write(ASSIGN_NUMBER, (user_id, expires_at, number_id))
+            inventory.remove(number_id)
+            expiry_scheduler.schedule('numbers', expires_at)
             return True
         except Exception as e:
             logger.error(f"Error assigning number: {e}")
@@ -63,45 +179,28 @@ class NumbersDB:
     async def expire_number(number_id: int) -> bool:
         """Expire a number"""
         try:
-            await db.execute(
-                """UPDATE numbers 
-                SET is_assigned = 0, 
-                    assigned_to = NULL,
-                    assigned_at = NULL,
-                    expires_at = NULL 
-                WHERE number_id = ?""",
-                (number_id,)
-            )
-            await db.conn.commit()
+            result = await db.write(EXPIRE_NUMBER, (number_id,))
+            if result.rows:
+                inventory.add(result.rows[0]['country_code'], number_id)
             return True
         except Exception as e:
             logger.error(f"Error expiring number: {e}")
             return False
 
     @staticmethod
-    async def get_user_numbers(user_id: int) -> list:
+    async def get_user_numbers(user_id: int) -> List[Number]:
         """Get all numbers assigned to user"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM numbers 
-                WHERE assigned_to = ? AND is_assigned = 1 
-                ORDER BY assigned_at DESC""",
-                (user_id,)
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_USER_NUMBERS, (user_id,))
         except Exception as e:
             logger.error(f"Error getting user numbers: {e}")
             return []
 
     @staticmethod
-    async def get_number(number_id: int) -> Optional[Dict[str, Any]]:
+    async def get_number(number_id: int) -> Optional[Number]:
         """Get number by ID"""
         try:
-            row = await db.fetch_one(
-                "SELECT * FROM numbers WHERE number_id = ?",
-                (number_id,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_NUMBER, (number_id,))
         except Exception as e:
             logger.error(f"Error getting number: {e}")
             return None
@@ -110,30 +209,41 @@ class NumbersDB:
     async def recycle_number(number_id: int) -> bool:
         """Recycle a number (make it available again)"""
         try:
-            await db.execute(
-                """UPDATE numbers 
-                SET is_assigned = 0, 
-                    assigned_to = NULL,
-                    assigned_at = NULL,
-                    expires_at = NULL 
-                WHERE number_id = ?""",
-                (number_id,)
-            )
-            await db.conn.commit()
+            result = await db.write(RECYCLE_NUMBER, (number_id,))
+            if result.rows:
+                inventory.add(result.rows[0]['country_code'], number_id)
             return True
         except Exception as e:
             logger.error(f"Error recycling number: {e}")
             return False
 
     @staticmethod
-    async def get_expired_numbers() -> list:
+    async def get_expired_numbers() -> List[Number]:
         """Get all expired numbers"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM numbers 
-                WHERE is_assigned = 1 AND expires_at <= datetime('now')""",
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_EXPIRED_NUMBERS)
         except Exception as e:
             logger.error(f"Error getting expired numbers: {e}")
             return []
+
+    @staticmethod
+    async def expire_due(now: datetime, limit: int) -> List[Number]:
+        """Release up to `limit` assigned numbers whose expiry has passed"""
+        try:
+            result = await db.write(EXPIRE_DUE, (now, limit))
+            for row in result.rows:
+                inventory.add(row['country_code'], row['number_id'])
+            return result.rows
+        except Exception as e:
+            logger.error(f"Error expiring due numbers: {e}")
+            return []
+
+    @staticmethod
+    async def get_expiry_deadlines() -> list:
+        """Get distinct expiry times of assigned numbers"""
+        try:
+            rows = await db.fetch_all(GET_EXPIRY_DEADLINES)
+            return [datetime.fromisoformat(row['expires_at']) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting numbers expiry deadlines: {e}")
+            return []
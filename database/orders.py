@@ -1,25 +1,63 @@
 from .db import db
-from typing import Optional, Dict, Any
+from .records import Order
+from typing import Optional, List
 import logging
 from datetime import datetime, timedelta
 from config import NUMBER_DURATION
+from services.expiry import expiry_scheduler
 
 logger = logging.getLogger(__name__)
 
+CREATE_ORDER = db.prepare("orders.create_order", """INSERT INTO orders
+    (user_id, number_id, account_id, price, expires_at)
+    VALUES (?, ?, ?, ?, ?)""")
+
+GET_ORDER = db.prepare("orders.get_order", f"SELECT {Order.select()} FROM orders WHERE order_id = ?", Order)
+
+UPDATE_OTP = db.prepare("orders.update_otp", "UPDATE orders SET otp_code = ? WHERE order_id = ?")
+
+# Only what "My Numbers" shows
+GET_ACTIVE_ORDERS = db.prepare("orders.get_active_orders", """SELECT o.order_id, o.otp_code, o.expires_at,
+        n.phone_number, n.country_code, c.country_name
+    FROM orders o
+    JOIN numbers n ON n.number_id = o.number_id
+    LEFT JOIN countries c ON c.country_code = n.country_code
+    WHERE o.user_id = ? AND o.status = 'active'
+    AND o.expires_at > datetime('now')
+    ORDER BY o.created_at DESC""", Order)
+
+GET_ACTIVE_ROUTES = db.prepare("orders.get_active_routes", """SELECT order_id, user_id, account_id FROM orders
+    WHERE status = 'active' AND account_id IS NOT NULL""", Order)
+
+MARK_EXPIRED = db.prepare("orders.mark_expired", "UPDATE orders SET status = 'expired' WHERE order_id = ?")
+
+GET_EXPIRED_ORDERS = db.prepare("orders.get_expired_orders", f"""SELECT {Order.select()} FROM orders
+    WHERE status = 'active' AND expires_at <= datetime('now')""", Order)
+
+GET_ORDER_BY_NUMBER = db.prepare("orders.get_order_by_number", f"""SELECT {Order.select()} FROM orders
+    WHERE number_id = ? AND status = 'active'
+    AND expires_at > datetime('now')""", Order)
+
+EXPIRE_DUE = db.prepare("orders.expire_due", """UPDATE orders SET status = 'expired'
+    WHERE order_id IN (
+        SELECT order_id FROM orders
+        WHERE status = 'active' AND expires_at <= ?
+        LIMIT ?
+    )
+    RETURNING order_id, account_id""", Order)
+
+GET_EXPIRY_DEADLINES = db.prepare("orders.get_expiry_deadlines", """SELECT DISTINCT expires_at FROM orders
+    WHERE status = 'active' AND expires_at IS NOT NULL""")
+
 class OrdersDB:
     @staticmethod
     async def create_order(user_id: int, number_id: int, account_id: int, price: int) -> Optional[int]:
         """Create a new order"""
         try:
             expires_at = datetime.now() + timedelta(seconds=NUMBER_DURATION)
-            cursor = await db.execute(
-                """INSERT INTO orders 
-                (user_id, number_id, account_id, price, expires_at) 
-                VALUES (?, ?, ?, ?, ?)""",
-                (user_id, number_id, account_id, price, expires_at)
-            )
-            await db.conn.commit()
-            order_id = cursor.lastrowid
+            result = await db.write(CREATE_ORDER, (user_id, number_id, account_id, price, expires_at))
+            order_id = result.lastrowid
+            expiry_scheduler.schedule('orders', expires_at)
             logger.info(f"Created order #{order_id} for user {user_id}")
             return order_id
         except Exception as e:
@@ -27,14 +65,10 @@ class OrdersDB:
             return None
 
     @staticmethod
-    async def get_order(order_id: int) -> Optional[Dict[str, Any]]:
+    async def get_order(order_id: int) -> Optional[Order]:
         """Get order by ID"""
         try:
-            row = await db.fetch_one(
-                "SELECT * FROM orders WHERE order_id = ?",
-                (order_id,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_ORDER, (order_id,))
         except Exception as e:
             logger.error(f"Error getting order: {e}")
             return None
@@ -43,70 +77,74 @@ class OrdersDB:
     async def update_otp(order_id: int, otp_code: str) -> bool:
         """Update OTP code for order"""
         try:
-            await db.execute(
-                "UPDATE orders SET otp_code = ? WHERE order_id = ?",
-                (otp_code, order_id)
-            )
-            await db.conn.commit()
+            await db.write(UPDATE_OTP, (otp_code, order_id))
             return True
         except Exception as e:
             logger.error(f"Error updating OTP: {e}")
             return False
 
     @staticmethod
-    async def get_active_orders(user_id: int) -> list:
-        """Get user's active orders"""
+    async def get_active_orders(user_id: int) -> List[Order]:
+        """Get user's active orders with their number and country"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM orders 
-                WHERE user_id = ? AND status = 'active' 
-                AND expires_at > datetime('now') 
-                ORDER BY created_at DESC""",
-                (user_id,)
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_ACTIVE_ORDERS, (user_id,))
         except Exception as e:
             logger.error(f"Error getting active orders: {e}")
             return []
 
+    @staticmethod
+    async def get_active_routes() -> List[Order]:
+        """Get account, order and buyer of every active order"""
+        try:
+            return await db.fetch_all(GET_ACTIVE_ROUTES)
+        except Exception as e:
+            logger.error(f"Error getting active routes: {e}")
+            return []
+
     @staticmethod
     async def mark_expired(order_id: int) -> bool:
         """Mark order as expired"""
         try:
-            await db.execute(
-                "UPDATE orders SET status = 'expired' WHERE order_id = ?",
-                (order_id,)
-            )
-            await db.conn.commit()
+            await db.write(MARK_EXPIRED, (order_id,))
             return True
         except Exception as e:
             logger.error(f"Error marking order expired: {e}")
             return False
 
     @staticmethod
-    async def get_expired_orders() -> list:
+    async def get_expired_orders() -> List[Order]:
         """Get all expired orders"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM orders 
-                WHERE status = 'active' AND expires_at <= datetime('now')""",
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_EXPIRED_ORDERS)
         except Exception as e:
             logger.error(f"Error getting expired orders: {e}")
             return []
 
     @staticmethod
-    async def get_order_by_number(number_id: int) -> Optional[Dict[str, Any]]:
+    async def get_order_by_number(number_id: int) -> Optional[Order]:
         """Get active order by number ID"""
         try:
-            row = await db.fetch_one(
-                """SELECT * FROM orders 
-                WHERE number_id = ? AND status = 'active' 
-                AND expires_at > datetime('now')""",
-                (number_id,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_ORDER_BY_NUMBER, (number_id,))
         except Exception as e:
             logger.error(f"Error getting order by number: {e}")
             return None
+
+    @staticmethod
+    async def expire_due(now: datetime, limit: int) -> List[Order]:
+        """Mark up to `limit` active orders past their expiry as expired"""
+        try:
+            result = await db.write(EXPIRE_DUE, (now, limit))
+            return result.rows
+        except Exception as e:
+            logger.error(f"Error expiring due orders: {e}")
+            return []
+
+    @staticmethod
+    async def get_expiry_deadlines() -> list:
+        """Get distinct expiry times of active orders"""
+        try:
+            rows = await db.fetch_all(GET_EXPIRY_DEADLINES)
+            return [datetime.fromisoformat(row['expires_at']) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting orders expiry deadlines: {e}")
+            return []
@@ -1,11 +1,55 @@
 from .db import db
-from typing import Optional, Dict, Any
+from .utrs import seen_utrs
+from .ledger import APPEND, DEPOSIT, to_paise
+from .users import user_cache, user_fills
+from .records import Payment
+from typing import Optional, Dict, Any, List, Tuple
 import logging
+import sqlite3
 from datetime import datetime, timedelta
-from config import MIN_DEPOSIT
+from config import MIN_DEPOSIT, PAYMENT_TIMEOUT
+from services.expiry import expiry_scheduler
 
 logger = logging.getLogger(__name__)
 
+CREATE_PAYMENT = db.prepare("payments.create_payment", """INSERT INTO payments (user_id, amount, expires_at, status)
+    VALUES (?, ?, ?, 'pending')""")
+
+GET_PAYMENT = db.prepare("payments.get_payment", f"SELECT {Payment.select()} FROM payments WHERE payment_id = ?", Payment)
+
+COMPLETE_PAYMENT = db.prepare("payments.complete", """UPDATE payments
+    SET utr = ?, status = 'completed', verified_at = CURRENT_TIMESTAMP
+    WHERE payment_id = ? AND status = 'pending' AND expires_at > ?
+    RETURNING payment_id, user_id, amount, utr""", Payment)
+
+GET_USER_PAYMENTS = db.prepare("payments.get_user_payments", f"""SELECT {Payment.select()} FROM payments
+    WHERE user_id = ?
+    ORDER BY created_at DESC LIMIT ?""", Payment)
+
+GET_ALL_PAYMENTS = db.prepare("payments.get_all_payments", f"""SELECT {Payment.select()} FROM payments
+    ORDER BY created_at DESC LIMIT ?""", Payment)
+
+GET_PAYMENTS_STATS = db.prepare("payments.get_payments_stats", """SELECT COUNT(*) AS total,
+        COALESCE(SUM(status = 'pending'), 0) AS pending,
+        COALESCE(SUM(status = 'completed'), 0) AS completed,
+        COALESCE(SUM(CASE WHEN status = 'completed' THEN amount END), 0) AS revenue
+    FROM payments""")
+
+# Only what statement matching needs
+GET_PENDING_PAYMENTS = db.prepare("payments.get_pending_payments", """SELECT payment_id, amount FROM payments
+    WHERE status = 'pending' AND expires_at > ?""", Payment)
+
+EXPIRE_DUE = db.prepare("payments.expire_due", """UPDATE payments SET status = 'expired'
+    WHERE payment_id IN (
+        SELECT payment_id FROM payments
+        WHERE status = 'pending' AND expires_at <= ?
+        LIMIT ?
+    )
+    RETURNING payment_id""", Payment)
+
+GET_EXPIRY_DEADLINES = db.prepare("payments.get_expiry_deadlines", """SELECT DISTINCT expires_at FROM payments
+    WHERE status = 'pending' AND expires_at IS NOT NULL""")
+
 class PaymentsDB:
     @staticmethod
     async def create_payment(user_id: int, amount: int) -> Optional[int]:
@@ -14,14 +58,10 @@ class PaymentsDB:
             if amount < MIN_DEPOSIT:
                 return None
 
-            expires_at = datetime.now() + timedelta(minutes=30)
-            cursor = await db.execute(
-                """INSERT INTO payments (user_id, amount, expires_at, status) 
-                VALUES (?, ?, ?, 'pending')""",
-                (user_id, amount, expires_at)
-            )
-            await db.conn.commit()
-            payment_id = cursor.lastrowid
+            expires_at = datetime.now() + timedelta(seconds=PAYMENT_TIMEOUT)
+            result = await db.write(CREATE_PAYMENT, (user_id, amount, expires_at))
+            payment_id = result.lastrowid
+            expiry_scheduler.schedule('payments', expires_at)
             logger.info(f"Created payment #{payment_id} for user {user_id}: ₹{amount}")
             return payment_id
         except Exception as e:
@@ -29,37 +69,30 @@ class PaymentsDB:
             return None
 
     @staticmethod
-    async def get_payment(payment_id: int) -> Optional[Dict[str, Any]]:
+    async def get_payment(payment_id: int) -> Optional[Payment]:
         """Get payment by ID"""
         try:
-            row = await db.fetch_one(
-                "SELECT * FROM payments WHERE payment_id = ?",
-                (payment_id,)
-            )
-            return dict(row) if row else None
+            return await db.fetch_one(GET_PAYMENT, (payment_id,))
         except Exception as e:
             logger.error(f"Error getting payment: {e}")
             return None
 
     @staticmethod
     async def verify_utr(payment_id: int, utr: str) -> bool:
-        """Verify UTR and mark payment as completed"""
+        """Verify UTR, mark payment as completed and credit the deposit"""
+        utr = utr.strip()
+        if utr in seen_utrs:
+            seen_utrs.rejected += 1
+            logger.warning(f"Rejected reused UTR for payment #{payment_id}: {utr}")
+            return False
         try:
-            # Check if UTR already exists
-            existing = await db.fetch_one(
-                "SELECT payment_id FROM payments WHERE utr = ?",
-                (utr,)
-            )
-            if existing:
+            credited, duplicates = await PaymentsDB.complete_many([(utr, payment_id)])
+            if duplicates:
+                seen_utrs.add(utr)
+                logger.warning(f"Rejected reused UTR for payment #{payment_id}: {utr}")
+                return False
+            if not credited:
                 return False
-
-            await db.execute(
-                """UPDATE payments 
-                SET utr = ?, status = 'completed', verified_at = CURRENT_TIMESTAMP 
-                WHERE payment_id = ? AND status = 'pending'""",
-                (utr, payment_id)
-            )
-            await db.conn.commit()
             logger.info(f"Verified UTR for payment #{payment_id}: {utr}")
             return True
         except Exception as e:
@@ -67,59 +100,93 @@ class PaymentsDB:
             return False
 
     @staticmethod
-    async def check_expiry(payment_id: int) -> bool:
-        """Check if payment is expired"""
-        try:
-            payment = await PaymentsDB.get_payment(payment_id)
-            if not payment:
-                return True
+    async def complete_many(matches: List[Tuple[str, int]]) -> Tuple[List[Payment], int]:
+        """Complete (utr, payment_id) pairs and credit them in one transaction.
 
-            if payment['status'] != 'pending':
-                return True
+        idx_payments_utr rejects a UTR already used by another payment;
+        those pairs are counted as duplicates. Payments that are no longer
+        pending or have expired are left alone.
+        """
+        credited = []
+        duplicates = 0
+        now = datetime.now()
+        async with db.transaction() as conn:
+            for utr, payment_id in matches:
+                try:
+                    rows = await db.run(conn, COMPLETE_PAYMENT, (utr, payment_id, now))
+                except sqlite3.IntegrityError:
+                    # Used meanwhile; only this statement is undone
+                    duplicates += 1
+                    continue
+                credited.extend(rows)
 
-            expires_at = datetime.fromisoformat(payment['expires_at'])
-            return datetime.now() > expires_at
-        except Exception as e:
-            logger.error(f"Error checking expiry: {e}")
-            return True
+            await db.run_many(
+                conn, APPEND,
+                [(row['user_id'], to_paise(row['amount']), DEPOSIT, row['payment_id']) for row in credited]
+            )
+
+        for row in credited:
+            seen_utrs.add(row['utr'])
+            # The payer is only known after the commit, when a fill may
+            # already hold the new balance: drop the entry, don't patch it
+            user_fills.invalidate(row['user_id'])
+            user_cache.pop(row['user_id'])
+        return credited, duplicates
 
     @staticmethod
-    async def get_user_payments(user_id: int, limit: int = 10) -> list:
+    async def get_user_payments(user_id: int, limit: int = 10) -> List[Payment]:
         """Get user's payment history"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM payments 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC LIMIT ?""",
-                (user_id, limit)
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_USER_PAYMENTS, (user_id, limit))
         except Exception as e:
             logger.error(f"Error getting user payments: {e}")
             return []
 
     @staticmethod
-    async def get_all_payments(limit: int = 50) -> list:
+    async def get_all_payments(limit: int = 50) -> List[Payment]:
         """Get all payments"""
         try:
-            rows = await db.fetch_all(
-                "SELECT * FROM payments ORDER BY created_at DESC LIMIT ?",
-                (limit,)
-            )
-            return [dict(row) for row in rows]
+            return await db.fetch_all(GET_ALL_PAYMENTS, (limit,))
         except Exception as e:
             logger.error(f"Error getting all payments: {e}")
             return []
 
     @staticmethod
-    async def get_pending_payments() -> list:
-        """Get all pending payments"""
+    async def get_payments_stats() -> Dict[str, Any]:
+        """Get payment counts and completed revenue"""
         try:
-            rows = await db.fetch_all(
-                """SELECT * FROM payments 
-                WHERE status = 'pending' AND expires_at > datetime('now')""",
-            )
-            return [dict(row) for row in rows]
+            row = await db.fetch_one(GET_PAYMENTS_STATS)
+            return dict(row) if row else {}
+        except Exception as e:
+            logger.error(f"Error getting payment stats: {e}")
+            return {}
+
+    @staticmethod
+    async def get_pending_payments() -> List[Payment]:
+        """Get id and amount of all pending payments"""
+        try:
+            # expires_at is stored in local time; datetime('now') is UTC
+            return await db.fetch_all(GET_PENDING_PAYMENTS, (datetime.now(),))
         except Exception as e:
             logger.error(f"Error getting pending payments: {e}")
             return []
+
+    @staticmethod
+    async def expire_due(now: datetime, limit: int) -> List[Payment]:
+        """Mark up to `limit` pending payments past their expiry as expired"""
+        try:
+            result = await db.write(EXPIRE_DUE, (now, limit))
+            return result.rows
+        except Exception as e:
+            logger.error(f"Error expiring due payments: {e}")
+            return []
+
+    @staticmethod
+    async def get_expiry_deadlines() -> list:
+        """Get distinct expiry times of pending payments"""
+        try:
+            rows = await db.fetch_all(GET_EXPIRY_DEADLINES)
+            return [datetime.fromisoformat(row['expires_at']) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting payments expiry deadlines: {e}")
+            return []
@@ -0,0 +1,89 @@
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List
+from config import QUERY_PROFILE_WINDOW
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _percentile(samples: List[float], percent: int) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    index = max(0, -(-len(samples) * percent // 100) - 1)
+    return samples[index]
+
+class StatementProfile:
+    """Lifetime totals plus a window of recent latencies for one statement"""
+    __slots__ = ('calls', 'rows', 'total', 'max', 'latencies')
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.latencies = deque(maxlen=window)
+
+class QueryProfiler:
+    """Per-statement call counts, latency percentiles and rows returned.
+
+    Percentiles cover the last `window` calls of each statement; counts
+    and totals cover everything since start (or the last reset).
+    """
+
+    def __init__(self, window: int = QUERY_PROFILE_WINDOW):
+        self.window = max(1, window)
+        self._profiles: Dict[str, StatementProfile] = {}
+        self.started = time.time()
+
+    def record(self, name: str, seconds: float, rows: int):
+        """Account one execution of a statement"""
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = StatementProfile(self.window)
+        profile.calls += 1
+        profile.rows += rows
+        profile.total += seconds
+        if seconds > profile.max:
+            profile.max = seconds
+        profile.latencies.append(seconds)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-statement metrics, most total time first"""
+        result = []
+        for name, profile in self._profiles.items():
+            samples = sorted(profile.latencies)
+            result.append({
+                'name': name,
+                'calls': profile.calls,
+                'rows': profile.rows,
+                'rows_per_call': round(profile.rows / profile.calls, 2),
+                'total_ms': round(profile.total * 1000, 2),
+                'p50_ms': round(_percentile(samples, 50) * 1000, 3),
+                'p95_ms': round(_percentile(samples, 95) * 1000, 3),
+                'p99_ms': round(_percentile(samples, 99) * 1000, 3),
+                'max_ms': round(profile.max * 1000, 3),
+            })
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+    def to_json(self, **sections) -> str:
+        """Dump the metrics (plus any extra sections) as a JSON document"""
+        return json.dumps({
+            'since': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            'window': self.window,
+            **sections,
+            'statements': self.stats(),
+        }, indent=2)
+
+    def dump(self, path: str):
+        """Write the JSON metrics to a file"""
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+        logger.info(f"Query profile written to {path}")
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        self._profiles = {}
+        self.started = time.time()
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Record:
+    """Slotted row object that reads like the dict it replaces.
+
+    Only the columns a query selected are set; the others behave like
+    missing keys (KeyError on record[key], the default on get()).
+    """
+    __slots__ = ()
+    # Table columns in schema order; __slots__ may add joined fields
+    columns: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> List[str]:
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def update(self, fields: Dict[str, Any]):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.keys()}
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self._asdict() == other._asdict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in self._asdict().items())
+        return f"{type(self).__name__}({fields})"
+
+    @classmethod
+    def select(cls, alias: str = None) -> str:
+        """Comma-separated table columns for a SELECT or RETURNING list"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + column for column in cls.columns)
+
+class User(Record):
+    columns = ('user_id', 'username', 'balance', 'created_at', 'is_banned',
+               'total_deposits', 'total_spent', 'total_numbers')
+    __slots__ = columns
+
+class Country(Record):
+    columns = ('country_id', 'country_code', 'country_name', 'price', 'is_active', 'created_at')
+    __slots__ = columns + ('available',)
+
+class Account(Record):
+    columns = ('account_id', 'session_string', 'phone_number', 'is_active', 'is_in_use',
+               'last_used', 'total_numbers_served', 'created_at')
+    __slots__ = columns
+
+class Number(Record):
+    columns = ('number_id', 'country_code', 'phone_number', 'is_assigned', 'assigned_to',
+               'assigned_at', 'expires_at', 'created_at')
+    __slots__ = columns
+
+class Order(Record):
+    columns = ('order_id', 'user_id', 'number_id', 'account_id', 'otp_code', 'price',
+               'status', 'created_at', 'expires_at')
+    __slots__ = columns + ('phone_number', 'country_code', 'country_name')
+
+class Payment(Record):
+    columns = ('payment_id', 'user_id', 'amount', 'utr', 'status', 'created_at',
+               'expires_at', 'verified_at')
+    __slots__ = columns
+
+# Constructors compiled per (record class, selected columns)
+_makers: Dict[Tuple[type, Tuple[str, ...]], Callable] = {}
+
+def _maker(cls: type, columns: Tuple[str, ...]) -> Callable:
+    """Build (once) a function turning a row tuple into a `cls` record"""
+    key = (cls, columns)
+    make = _makers.get(key)
+    if make is None:
+        unknown = [column for column in columns if column not in cls.__slots__]
+        if unknown:
+            raise ValueError(f"{cls.__name__} has no field for columns {unknown}")
+        # Straight-line attribute stores: no per-row loop over the columns
+        body = "".join(f"    record.{column} = row[{index}]\n" for index, column in enumerate(columns))
+        source = f"def make(row):\n    record = new(cls)\n{body}    return record\n"
+        namespace = {'new': object.__new__, 'cls': cls}
+        exec(source, namespace)
+        make = _makers[key] = namespace['make']
+    return make
+
+def row_factory(cls: type, description: Iterable[tuple]) -> Callable:
+    """sqlite3 row factory for one cursor whose rows become `cls` records"""
+    make = _maker(cls, tuple(column[0] for column in description))
+    return lambda cursor, row: make(row)
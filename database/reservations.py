@@ -0,0 +1,67 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+from .db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (last_used, total_numbers_served, account_id); never-used accounts
+# sort first, matching ORDER BY last_used, total_numbers_served.
+Entry = Tuple[str, int, int]
+
+LOAD_FREE_ACCOUNTS = db.prepare("reservations.load", """SELECT account_id, last_used, total_numbers_served FROM accounts
+    WHERE is_active = 1 AND is_in_use = 0""")
+
+class AccountReservationQueue:
+    """In-memory priority queue of free accounts mirrored from the DB.
+
+    Popping only proposes a candidate; the caller still claims it with a
+    conditional UPDATE, so a stale entry costs one retry and can never
+    double-assign an account. Removed accounts are deleted lazily.
+    """
+
+    def __init__(self):
+        self._heap: List[Entry] = []
+        self._free: Dict[int, Entry] = {}
+        self.loaded = False
+
+    async def load(self):
+        """Rebuild the queue from free, active accounts"""
+        rows = await db.fetch_all(LOAD_FREE_ACCOUNTS)
+        self._free = {
+            row['account_id']: (row['last_used'] or "", row['total_numbers_served'] or 0, row['account_id'])
+            for row in rows
+        }
+        self._heap = list(self._free.values())
+        heapq.heapify(self._heap)
+        self.loaded = True
+        logger.info(f"Account queue loaded: {len(self._free)} free accounts")
+
+    def push(self, account_id: int, last_used: Optional[str] = None, served: int = 0):
+        """Offer an account for the next claim"""
+        entry = (last_used or "", served or 0, account_id)
+        self._free[account_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def restore(self, entry: Entry):
+        """Put back an entry returned by pop() whose claim was rolled back"""
+        self.push(entry[2], entry[0], entry[1])
+
+    def discard(self, account_id: int):
+        """Withdraw an account (claimed or disabled)"""
+        self._free.pop(account_id, None)
+
+    def pop(self) -> Optional[Entry]:
+        """Take the least recently used free account, if any"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._free.get(entry[2]) == entry:
+                del self._free[entry[2]]
+                return entry
+        return None
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+# Global account reservation queue
+account_queue = AccountReservationQueue()
@@ -1,79 +1,167 @@
-from .db import db
-from datetime import datetime
+from .db import db, Statement
+from .records import User
+from .ledger import LedgerDB, DEPOSIT, ADJUSTMENT, LIVE_TOTALS, to_paise, to_user_fields, apply_entry
+from typing import Optional, Dict, Any, List
+from config import USER_CACHE_SIZE, USER_CACHE_TTL
+from utils.cache import TTLCache, FillGuard, Fill
+import logging
+
+logger = logging.getLogger(__name__)
+
+GET_USER = db.prepare("users.get_user", f"SELECT {User.select()} FROM users WHERE user_id = ?", User)
+
+CREATE_USER = db.prepare("users.create_user", f"""INSERT OR IGNORE INTO users (user_id, username) VALUES (?, ?)
+    RETURNING {User.select()}""", User)
+
+# Always returns the row, with the live ledger totals in place of the
+# stored ones, so an uncached /start costs this one statement
+REGISTER = db.prepare("users.register", f"""INSERT INTO users (user_id, username) VALUES (?1, ?2)
+    ON CONFLICT(user_id) DO UPDATE SET username = excluded.username
+    RETURNING user_id, username, created_at, is_banned,
+    {LIVE_TOTALS}""", User)
+
+GET_ALL_USERS = db.prepare("users.get_all_users", f"SELECT {User.select()} FROM users ORDER BY created_at DESC LIMIT ?", User)
+
+GET_USERS_COUNT = db.prepare("users.get_users_count", "SELECT COUNT(*) as count FROM users")
+
+# Owned by the balance ledger and mirrored onto users by LedgerDB.snapshot
+LEDGER_FIELDS = ('balance', 'total_deposits', 'total_spent', 'total_numbers')
+
+# Write-through cache of user rows keyed by Telegram ID. Every write below
+# returns the fresh row and stores it, so cached balances stay exact.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# Balance writes patch cached rows in place; a miss being filled while one
+# commits must not store the totals it read before the write
+user_fills = FillGuard()
+
+async def _remember(user: User, fill: Fill) -> User:
+    """Cache a users row with its live ledger balance unless a write overlapped"""
+    totals = await LedgerDB.get_totals(user['user_id'])
+    if totals:
+        user.update(to_user_fields(totals))
+    if not fill.stale:
+        user_cache.set(user['user_id'], user)
+    return user
 
 class UserDB:
     @staticmethod
-    def get_user(telegram_id):
+    async def get_user(telegram_id: int) -> Optional[User]:
         """Get user by Telegram ID"""
-        return db.fetch_one(
-            "SELECT * FROM users WHERE telegram_id = ?",
-            (telegram_id,)
-        )
+        user = user_cache.get(telegram_id)
+        if user:
+            return user
+        try:
+            with user_fills.filling(telegram_id) as fill:
+                user = await db.fetch_one(GET_USER, (telegram_id,))
+                if not user:
+                    return None
+                return await _remember(user, fill)
+        except Exception as e:
+            logger.error(f"Error getting user: {e}")
+            return None
     
     @staticmethod
-    def create_user(telegram_id, username):
+    async def create_user(telegram_id: int, username: str) -> Optional[User]:
         """Create new user"""
-        db.execute_query(
-            "INSERT INTO users (telegram_id, username) VALUES (?, ?)",
-            (telegram_id, username)
-        )
-        return UserDB.get_user(telegram_id)
+        try:
+            with user_fills.filling(telegram_id) as fill:
+                result = await db.write(CREATE_USER, (telegram_id, username))
+                if result.rows:
+                    return await _remember(result.rows[0], fill)
+            return await UserDB.get_user(telegram_id)
+        except Exception as e:
+            logger.error(f"Error creating user: {e}")
+            return None
     
     @staticmethod
-    def update_balance(user_id, amount):
-        """Update user balance"""
-        db.execute_query(
-            "UPDATE users SET balance = balance + ? WHERE id = ?",
-            (amount, user_id)
-        )
-        
-        if amount > 0:
-            db.execute_query(
-                "UPDATE users SET total_deposits = total_deposits + ? WHERE id = ?",
-                (amount, user_id)
-            )
-        else:
-            db.execute_query(
-                "UPDATE users SET total_spent = total_spent + ? WHERE id = ?",
-                (abs(amount), user_id)
-            )
-        
+    async def register(telegram_id: int, username: str) -> Optional[User]:
+        """Create a user or refresh their username in one statement"""
+        cached = user_cache.get(telegram_id)
+        if cached and cached['username'] == username:
+            return cached
+        try:
+            with user_fills.filling(telegram_id) as fill:
+                result = await db.write(REGISTER, (telegram_id, username))
+            user = result.rows[0]
+            # The totals came back in paise
+            user.update(to_user_fields(user))
+            if not fill.stale:
+                user_cache.set(telegram_id, user)
+            return user
+        except Exception as e:
+            logger.error(f"Error registering user: {e}")
+            return None
+    
+    @staticmethod
+    async def update_balance(user_id: int, amount: int, kind: str = None, ref_id: int = None) -> bool:
+        """Credit (or debit, if negative) a user's balance in rupees"""
+        paise = to_paise(amount)
+        kind = kind or (DEPOSIT if paise >= 0 else ADJUSTMENT)
+        with user_fills.writing(user_id):
+            if not await LedgerDB.record(user_id, paise, kind, ref_id):
+                return False
+            user = user_cache.peek(user_id)
+            if user:
+                apply_entry(user, kind, paise)
         return True
     
     @staticmethod
-    def get_user_by_id(user_id):
-        """Get user by database ID"""
-        return db.fetch_one(
-            "SELECT * FROM users WHERE id = ?",
-            (user_id,)
-        )
+    async def get_user_by_id(user_id: int) -> Optional[User]:
+        """Get user by database ID (the Telegram ID)"""
+        return await UserDB.get_user(user_id)
     
     @staticmethod
-    def get_all_users(limit=100):
+    async def get_all_users(limit: int = 100) -> List[User]:
         """Get all users"""
-        return db.fetch_all(
-            "SELECT * FROM users ORDER BY id DESC LIMIT ?",
-            (limit,)
-        )
+        try:
+            return await db.fetch_all(GET_ALL_USERS, (limit,))
+        except Exception as e:
+            logger.error(f"Error getting all users: {e}")
+            return []
     
     @staticmethod
-    def get_users_count():
+    async def get_users_count() -> int:
         """Get total users count"""
-        result = db.fetch_one("SELECT COUNT(*) as count FROM users")
-        return result['count'] if result else 0
+        try:
+            result = await db.fetch_one(GET_USERS_COUNT)
+            return result['count'] if result else 0
+        except Exception as e:
+            logger.error(f"Error counting users: {e}")
+            return 0
     
     @staticmethod
-    def update_user(user_id, **kwargs):
-        """Update user fields"""
+    async def update_user(user_id: int, **kwargs) -> bool:
+        """Update user fields other than the ledger-owned totals"""
         if not kwargs:
             return False
+        ledger_fields = [key for key in kwargs if key in LEDGER_FIELDS]
+        if ledger_fields:
+            # The next snapshot would overwrite them; use update_balance
+            raise ValueError(f"{ledger_fields} are kept by the balance ledger")
         
         set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
         values = list(kwargs.values())
         values.append(user_id)
         
-        db.execute_query(
-            f"UPDATE users SET {set_clause} WHERE id = ?",
-            values
-        )
-        return True
\ No newline at end of file
+        try:
+            with user_fills.writing(user_id):
+                # The SET clause varies, so this is named but not registered
+                result = await db.write(
+                    Statement("users.update_user", f"UPDATE users SET {set_clause} WHERE user_id = ? RETURNING user_id", User),
+                    tuple(values)
+                )
+                if not result.rows:
+                    return False
+                user = user_cache.peek(user_id)
+                if user:
+                    user.update(kwargs)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating user: {e}")
+            user_cache.pop(user_id)
+            return False
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """User cache hit/miss counters"""
+        return user_cache.stats()
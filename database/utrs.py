@@ -0,0 +1,40 @@
+from typing import Set
+from .db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOAD_USED_UTRS = db.prepare("utrs.load", "SELECT utr FROM payments WHERE utr IS NOT NULL")
+
+class SeenUtrs:
+    """In-memory set of every UTR already attached to a payment.
+
+    Lets repeated submissions of a known UTR be rejected without a
+    database round trip. The unique index on payments.utr stays the
+    source of truth; a miss here still goes to SQLite.
+    """
+
+    def __init__(self):
+        self._utrs: Set[str] = set()
+        self.loaded = False
+        self.rejected = 0
+
+    async def load(self):
+        """Rebuild the set from the payments table"""
+        rows = await db.fetch_all(LOAD_USED_UTRS)
+        self._utrs = {row['utr'] for row in rows}
+        self.loaded = True
+        logger.info(f"Loaded {len(self._utrs)} used UTRs")
+
+    def add(self, utr: str):
+        """Remember a UTR as used"""
+        self._utrs.add(utr)
+
+    def __contains__(self, utr: str) -> bool:
+        return utr in self._utrs
+
+    def __len__(self) -> int:
+        return len(self._utrs)
+
+# Global seen-UTR set
+seen_utrs = SeenUtrs()
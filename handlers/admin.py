@@ -1,14 +1,50 @@
-from telegram import Update
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+import asyncio
+import csv
+import io
+import os
+from typing import Any, Dict
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
-from config import ADMIN_IDS, UPI_ID
+from config import ADMIN_IDS, UPI_ID, SESSION_FOLDER
 from keyboards.admins import AdminKeyboards
 from keyboards.main import MainKeyboards
+from keyboards.buy import BuyKeyboards
 from database.users import UserDB
-from database.countries import CountryDB
-from database.accounts import AccountDB
-from database.numbers import NumberDB
-from database.payments import PaymentDB
+from database.countries import CountriesDB
+from database.accounts import AccountsDB
+from database.numbers import NumbersDB
+from database.payments import PaymentsDB
+from services.statements import StatementService
+from services.imports import ImportService
+from database.db import db
+
+# Statement rows listed in the /importutr reply for manual review
+REVIEW_LIST_LIMIT = 20
+
+def _runtime_stats() -> Dict[str, Dict[str, Any]]:
+    """Reader pool, group commit and cache metrics"""
+    return {
+        'pool': db.get_pool_stats(),
+        'commits': db.get_commit_stats(),
+        'user_cache': UserDB.cache_stats(),
+        'menu_cache': BuyKeyboards.cache_stats(),
+    }
+
+def _format_runtime_stats(runtime: Dict[str, Dict[str, Any]]) -> list:
+    """Summary lines for the /querystats header"""
+    pool = runtime['pool']
+    commits = runtime['commits']
+    users = runtime['user_cache']
+    menu = runtime['menu_cache']
+    return [
+        f"🔌 **Pool:** {pool['in_use']}/{pool['pool_size']} readers busy, {pool['waiting']} waiting, "
+        f"wait avg {pool['avg_wait_ms']:.2f} / max {pool['max_wait_ms']:.2f} ms",
+        f"💾 **Commits:** {commits['writes']} writes in {commits['batches']} batches "
+        f"(avg {commits['avg_batch_size']:.1f}), {commits['queued']} queued",
+        f"👤 **User cache:** {users['size']}/{users['maxsize']} rows, "
+        f"{users['hit_rate']:.0%} hits ({users['hits']} / {users['misses']} misses)",
+        f"🌍 **Menu cache:** {menu['hit_rate']:.0%} hits ({menu['hits']} / {menu['misses']} misses)",
+    ]
 
 class AdminHandler:
     @staticmethod
@@ -38,18 +74,20 @@ class AdminHandler:
             return
         
         # Get stats
-        users_count = UserDB.get_users_count()
-        countries = CountryDB.get_all_countries()
-        accounts = AccountDB.get_all_accounts()
-        numbers_stats = NumberDB.get_stats()
-        payments_stats = PaymentDB.get_payments_stats()
+        users_count, countries_count, accounts_count, numbers_stats, payments_stats = await asyncio.gather(
+            UserDB.get_users_count(),
+            CountriesDB.get_countries_count(),
+            AccountsDB.get_accounts_count(),
+            NumbersDB.get_stats(),
+            PaymentsDB.get_payments_stats(),
+        )
         
         dashboard_text = f"""
 **📊 Admin Dashboard**
 
 👥 **Total Users:** {users_count}
-🌍 **Countries:** {len(countries)}
-📱 **Accounts:** {len(accounts)}
+🌍 **Countries:** {countries_count}
+📱 **Accounts:** {accounts_count}
 🔢 **Total Numbers:** {numbers_stats.get('total', 0)}
 🟢 **Available Numbers:** {numbers_stats.get('available', 0)}
 💰 **Total Revenue:** ₹{payments_stats.get('revenue', 0)}
@@ -96,7 +134,7 @@ class AdminHandler:
             await query.edit_message_text("❌ Access denied.")
             return
         
-        countries = CountryDB.get_all_countries()
+        countries = await CountriesDB.get_countries_with_stock()
         
         if not countries:
             await query.edit_message_text("No countries found.")
@@ -104,14 +142,11 @@ class AdminHandler:
         
         countries_text = "**Countries List:**\n\n"
         for country in countries:
-            numbers = NumberDB.get_available_numbers(country['id'], limit=1000)
-            from config import COUNTRY_RATES
-            price = COUNTRY_RATES.get(country['name'], 10)
             countries_text += (
-                f"{country['flag']} **{country['name']}**\n"
-                f"Code: {country['code']}\n"
-                f"Available Numbers: {len(numbers)}\n"
-                f"Price: ₹{price}\n"
+                f"**{country['country_name']}**\n"
+                f"Code: {country['country_code']}\n"
+                f"Available Numbers: {country['available']}\n"
+                f"Price: ₹{country['price']}\n"
                 f"━━━━━━━━━━━━━━\n"
             )
         
@@ -120,3 +155,158 @@ class AdminHandler:
             parse_mode="Markdown",
             reply_markup=AdminKeyboards.countries_list(countries)
         )
+    
+    @staticmethod
+    async def _read_replied_document(update: Update, usage: str):
+        """Return the lines of the document an admin command replies to"""
+        message = update.message
+        if update.effective_user.id not in ADMIN_IDS:
+            await message.reply_text("❌ Access denied.")
+            return None
+        
+        reply = message.reply_to_message
+        document = reply.document if reply else None
+        if not document:
+            await message.reply_text(usage)
+            return None
+        
+        file = await document.get_file()
+        data = await file.download_as_bytearray()
+        return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    
+    @staticmethod
+    async def handle_import_utr(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /importutr sent as a reply to a bank statement CSV"""
+        lines = await AdminHandler._read_replied_document(
+            update, "Reply to a bank statement CSV with /importutr."
+        )
+        if lines is None:
+            return
+        
+        report = await StatementService.import_statement(lines)
+        
+        await update.message.reply_text(
+            f"**📥 Statement Imported**\n\n"
+            f"Rows: {report['rows']}\n"
+            f"✅ Matched: {report['matched']} (₹{report['credited']} credited)\n"
+            f"❓ Unmatched: {report['unmatched']}\n"
+            f"♻️ Duplicate: {report['duplicate']}\n"
+            f"🔎 Needs review: {report['review']}\n"
+            f"🚫 Invalid: {report['invalid']}\n\n"
+            f"Took {report['duration_ms']} ms ({report['rows_per_sec']} rows/s)",
+            parse_mode="Markdown"
+        )
+        
+        # Credits without a matching Payment ID are never applied automatically
+        if report['review_items']:
+            lines = [f"`{item['utr']}` ₹{item['amount']}" for item in report['review_items'][:REVIEW_LIST_LIMIT]]
+            more = len(report['review_items']) - len(lines)
+            await update.message.reply_text(
+                "**🔎 Confirm by hand** (amount matches a pending payment, "
+                "Payment ID missing or different):\n\n" + "\n".join(lines)
+                + (f"\n…and {more} more" if more > 0 else ""),
+                parse_mode="Markdown"
+            )
+    
+    @staticmethod
+    async def handle_import_numbers(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /importnumbers [COUNTRY] sent as a reply to a numbers file"""
+        lines = await AdminHandler._read_replied_document(
+            update,
+            "Reply to a file of numbers with /importnumbers [COUNTRY].\n"
+            "One number per line as IN,+911234567890, or just +911234567890 with a country."
+        )
+        if lines is None:
+            return
+        
+        country_code = context.args[0].upper() if context.args else None
+        report = await ImportService.import_numbers(lines, country_code)
+        
+        await update.message.reply_text(
+            f"**🔢 Numbers Imported**\n\n"
+            f"Rows: {report['rows']}\n"
+            f"✅ Added: {report['inserted']}\n"
+            f"♻️ Already in stock: {report['duplicate']}\n"
+            f"🚫 Invalid: {report['invalid']}\n"
+            f"🌍 Unknown country: {report['unknown_country']}\n\n"
+            f"Took {report['duration_ms']} ms ({report['rows_per_sec']} rows/s)",
+            parse_mode="Markdown"
+        )
+    
+    @staticmethod
+    async def handle_import_sessions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /importsessions [path] for a folder or zip under SESSION_FOLDER"""
+        if update.effective_user.id not in ADMIN_IDS:
+            await update.message.reply_text("❌ Access denied.")
+            return
+        
+        root = os.path.realpath(SESSION_FOLDER)
+        source = os.path.realpath(os.path.join(root, context.args[0])) if context.args else root
+        # Absolute paths, ".." and symlinks must not lead outside the session folder
+        if source != root and not source.startswith(root + os.sep):
+            await update.message.reply_text(f"❌ Path must be inside {SESSION_FOLDER}.")
+            return
+        if not os.path.exists(source):
+            await update.message.reply_text(f"❌ {source} does not exist.")
+            return
+        
+        report = await ImportService.import_sessions(source)
+        
+        # Per-item results go back as a CSV attachment
+        output = io.StringIO()
+        writer = csv.DictWriter(
+            output, fieldnames=['source', 'status', 'reason', 'dc_id', 'user_id', 'account_id'], restval=''
+        )
+        writer.writeheader()
+        writer.writerows(report['items'])
+        
+        await update.message.reply_document(
+            document=io.BytesIO(output.getvalue().encode()),
+            filename="session_import.csv",
+            caption=(
+                f"📱 Sessions imported from {source}\n\n"
+                f"Files: {report['files']}\n"
+                f"✅ Added: {report['added']}\n"
+                f"♻️ Duplicate: {report['duplicate']}\n"
+                f"🚫 Invalid: {report['invalid']}\n\n"
+                f"Took {report['duration_ms']} ms"
+            )
+        )
+    
+    @staticmethod
+    async def handle_query_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /querystats [json|reset] with per-statement latency and pool metrics"""
+        if update.effective_user.id not in ADMIN_IDS:
+            await update.message.reply_text("❌ Access denied.")
+            return
+        
+        action = context.args[0].lower() if context.args else ""
+        if action == "reset":
+            db.profiler.reset()
+            await update.message.reply_text("✅ Query stats reset.")
+            return
+        if action == "json":
+            await update.message.reply_document(
+                document=io.BytesIO(db.profiler.to_json(**_runtime_stats()).encode()),
+                filename="query_stats.json",
+                caption="📈 Query profile"
+            )
+            return
+        
+        stats = db.profiler.stats()
+        lines = _format_runtime_stats(_runtime_stats())
+        if not stats:
+            lines.append("\nNo queries recorded yet.")
+            await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+            return
+        
+        # Slowest statements by total time first
+        lines.append("\n**📈 Query Stats** (ms: p50 / p95 / p99)\n")
+        for item in stats[:15]:
+            lines.append(
+                f"`{item['name']}`\n"
+                f"   {item['calls']} calls, {item['rows_per_call']} rows, {item['total_ms']:.0f} ms total\n"
+                f"   {item['p50_ms']} / {item['p95_ms']} / {item['p99_ms']}"
+            )
+        lines.append(f"\n{len(stats)} statements. /querystats json for all of them.")
+        await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
@@ -1,16 +1,26 @@
-from pyrogram import filters
-from database.users import get_user
-from handlers.menu import main_menu
+from telegram import Update
+from telegram.ext import ContextTypes
+from database.users import UserDB
+from keyboards.main import MainKeyboards
 
-async def balance_callback(client, cq):
-    if cq.data != "balance":
-        return
-
-    user = await get_user(cq.from_user.id)
-    await cq.message.edit_text(
-        f"💰 **Your Balance:** ₹{user['balance']}",
-        reply_markup=main_menu()
-    )
-
-def setup(client):
-    client.add_handler(filters.callback_query(balance_callback))
+class BalanceHandler:
+    @staticmethod
+    async def handle_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle balance request"""
+        query = update.callback_query
+        await query.answer()
+        
+        user_data = await UserDB.get_user(query.from_user.id)
+        
+        if not user_data:
+            await query.edit_message_text("Please use /start first.")
+            return
+        
+        await query.edit_message_text(
+            f"💰 **Your Balance:** ₹{user_data['balance']}\n\n"
+            f"**Total Deposits:** ₹{user_data['total_deposits']}\n"
+            f"**Total Spent:** ₹{user_data['total_spent']}\n"
+            f"**Numbers Bought:** {user_data['total_numbers']}",
+            parse_mode="Markdown",
+            reply_markup=MainKeyboards.main_menu()
+        )
@@ -1,13 +1,12 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from database.countries import CountryDB
-from database.numbers import NumberDB
-from database.accounts import AccountDB
-from database.users import UserDB
-from database.orders import OrderDB
-from config import COUNTRY_RATES
+from database.countries import CountriesDB
+from database.numbers import NumbersDB
+from config import NUMBER_DURATION
 from keyboards.buy import BuyKeyboards
 from keyboards.main import MainKeyboards
+from services.purchase import PurchaseService
+from services.client_pool import client_pool
 
 class BuyHandler:
     @staticmethod
@@ -16,20 +15,20 @@ class BuyHandler:
         query = update.callback_query
         await query.answer()
         
-        country_id = int(query.data.split("_")[1])
-        country = CountryDB.get_country(country_id)
+        country_code = query.data.split("_", 1)[1]
+        country = await CountriesDB.get_country(country_code)
         
         if not country:
             await query.edit_message_text("Country not found.")
             return
         
         await query.edit_message_text(
-            f"**{country['flag']} {country['name']} - Available Numbers**\n\n"
-            f"Price per number: ₹{COUNTRY_RATES.get(country['name'], 10)}\n"
-            f"Duration: 10 minutes\n\n"
+            f"**{country['country_name']} - Available Numbers**\n\n"
+            f"Price per number: ₹{country['price']}\n"
+            f"Duration: {NUMBER_DURATION // 60} minutes\n\n"
             f"Select a number:",
             parse_mode="Markdown",
-            reply_markup=BuyKeyboards.numbers_menu(country_id)
+            reply_markup=await BuyKeyboards.numbers_menu(country_code, country['price'])
         )
     
     @staticmethod
@@ -39,23 +38,27 @@ class BuyHandler:
         await query.answer()
         
         number_id = int(query.data.split("_")[2])
-        number = NumberDB.get_number(number_id)
+        number = await NumbersDB.get_number(number_id)
         
-        if not number:
+        if not number or number['is_assigned']:
             await query.edit_message_text("Number not found.")
             return
         
-        country = CountryDB.get_country(number['country_id'])
-        price = COUNTRY_RATES.get(country['name'], 10)
+        country = await CountriesDB.get_country(number['country_code'])
+        if not country:
+            await query.edit_message_text("Country not found.")
+            return
+        price = country['price']
+        minutes = NUMBER_DURATION // 60
         
         await query.edit_message_text(
             f"**Number Details**\n\n"
-            f"📞 **Number:** `{number['number']}`\n"
-            f"🌍 **Country:** {country['flag']} {country['name']}\n"
+            f"📞 **Number:** `{number['phone_number']}`\n"
+            f"🌍 **Country:** {country['country_name']}\n"
             f"💰 **Price:** ₹{price}\n"
-            f"⏰ **Duration:** 10 minutes\n\n"
+            f"⏰ **Duration:** {minutes} minutes\n\n"
             f"**Note:** You will receive OTPs automatically.\n"
-            f"Number expires 10 minutes after purchase.",
+            f"Number expires {minutes} minutes after purchase.",
             parse_mode="Markdown",
             reply_markup=BuyKeyboards.confirm_purchase(number_id, price)
         )
@@ -67,68 +70,45 @@ class BuyHandler:
         await query.answer()
         
         number_id = int(query.data.split("_")[2])
-        user = query.from_user
-        user_data = UserDB.get_user(user.id)
+        result = await PurchaseService.purchase(query.from_user.id, number_id)
         
-        if not user_data:
-            await query.edit_message_text("Please use /start first.")
+        if result['success']:
+            # Connect the account now so it is listening before the OTP arrives
+            client_pool.warm(result['account_id'])
+            await query.edit_message_text(
+                f"✅ **Purchase Successful!**\n\n"
+                f"📞 **Number:** `{result['phone_number']}`\n"
+                f"🌍 **Country:** {result['country_name']}\n"
+                f"💰 **Amount:** ₹{result['price']}\n"
+                f"⏰ **Expires:** In {NUMBER_DURATION // 60} minutes\n"
+                f"💳 **New Balance:** ₹{result['balance']}\n\n"
+                f"**OTPs will be forwarded here automatically.**\n"
+                f"Keep this chat open to receive OTPs.",
+                parse_mode="Markdown",
+                reply_markup=MainKeyboards.main_menu()
+            )
             return
         
-        number = NumberDB.get_number(number_id)
-        if not number:
+        error = result['error']
+        if error == 'user_not_found':
+            await query.edit_message_text("Please use /start first.")
+        elif error in ('number_unavailable', 'country_unavailable'):
             await query.edit_message_text("Number not found.")
-            return
-        
-        country = CountryDB.get_country(number['country_id'])
-        price = COUNTRY_RATES.get(country['name'], 10)
-        
-        # Check balance
-        if user_data['balance'] < price:
+        elif error == 'insufficient_balance':
             from keyboards.deposit import DepositKeyboards
             await query.edit_message_text(
                 f"❌ **Insufficient Balance**\n\n"
-                f"Required: ₹{price}\n"
-                f"Your Balance: ₹{user_data['balance']}\n\n"
+                f"Required: ₹{result['price']}\n"
+                f"Your Balance: ₹{result['balance']}\n\n"
                 f"Please deposit first.",
                 reply_markup=DepositKeyboards.deposit_amounts()
             )
-            return
-        
-        # Find available account
-        account = AccountDB.get_available_account(country['id'])
-        if not account:
+        elif error == 'no_account':
             await query.edit_message_text(
                 f"❌ **Temporarily Unavailable**\n\n"
-                f"No accounts available for {country['name']}.\n"
+                f"No accounts available for {result['country_name']}.\n"
                 f"Please try another country or contact support.",
-                reply_markup=BuyKeyboards.countries_menu()
-            )
-            return
-        
-        # Process purchase
-        price = NumberDB.purchase_number(number_id, user_data['id'], account['id'])
-        
-        if price:
-            # Update user balance
-            UserDB.update_balance(user_data['id'], -price)
-            
-            # Create order
-            OrderDB.create_order(user_data['id'], number_id, price)
-            
-            # Get updated user data
-            user_data = UserDB.get_user(user.id)
-            
-            await query.edit_message_text(
-                f"✅ **Purchase Successful!**\n\n"
-                f"📞 **Number:** `{number['number']}`\n"
-                f"🌍 **Country:** {country['flag']} {country['name']}\n"
-                f"💰 **Amount:** ₹{price}\n"
-                f"⏰ **Expires:** In 10 minutes\n"
-                f"💳 **New Balance:** ₹{user_data['balance']}\n\n"
-                f"**OTPs will be forwarded here automatically.**\n"
-                f"Keep this chat open to receive OTPs.",
-                parse_mode="Markdown",
-                reply_markup=MainKeyboards.main_menu()
+                reply_markup=await BuyKeyboards.countries_menu()
             )
         else:
             await query.edit_message_text(
@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.users import UserDB
-from database.payments import PaymentDB
+from database.payments import PaymentsDB
 from config import MIN_DEPOSIT, UPI_ID
 from keyboards.deposit import DepositKeyboards
 from keyboards.main import MainKeyboards
@@ -33,7 +33,7 @@ class DepositHandler:
         """Create payment for selected amount"""
         query = update.callback_query
         user = query.from_user
-        user_data = UserDB.get_user(user.id)
+        user_data = await UserDB.get_user(user.id)
         
         if not user_data:
             await query.edit_message_text("Please use /start first.")
@@ -47,7 +47,7 @@ class DepositHandler:
             return
         
         # Create payment record
-        payment_id = PaymentDB.create_payment(user_data['id'], amount)
+        payment_id = await PaymentsDB.create_payment(user.id, amount)
         
         if not payment_id:
             await query.edit_message_text(
@@ -56,16 +56,9 @@ class DepositHandler:
             )
             return
         
-        # Generate QR code
-        qr_image = PaymentService.generate_qr_code(amount, payment_id)
-        instructions = PaymentService.get_payment_instructions(payment_id, amount)
-        
         # Send QR code
-        await query.message.reply_photo(
-            photo=qr_image,
-            caption=instructions,
-            parse_mode="Markdown"
-        )
+        instructions = PaymentService.get_payment_instructions(payment_id, amount)
+        await PaymentService.send_qr_code(query.message, amount, payment_id, instructions)
         
         await query.edit_message_text(
             f"**Payment Created**\n\n"
@@ -82,5 +75,5 @@ class DepositHandler:
         context.user_data['payment_info'] = {
             'payment_id': payment_id,
             'amount': amount,
-            'user_id': user_data['id']
+            'user_id': user.id
         }
\ No newline at end of file
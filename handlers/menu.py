@@ -27,7 +27,7 @@ class MenuHandler:
         await query.edit_message_text(
             "**Select Country:**\n\nChoose a country to see available numbers.",
             parse_mode="Markdown",
-            reply_markup=BuyKeyboards.countries_menu()
+            reply_markup=await BuyKeyboards.countries_menu()
         )
     
     @staticmethod
@@ -38,4 +38,11 @@ class MenuHandler:
         
         from config import MIN_DEPOSIT, UPI_ID
         
-        await query.edit_message_text
\ No newline at end of file
+        await query.edit_message_text(
+            f"**💰 Deposit Balance**\n\n"
+            f"Select an amount or choose Other Amount.\n"
+            f"Minimum deposit: ₹{MIN_DEPOSIT}\n"
+            f"UPI ID: `{UPI_ID}`",
+            parse_mode="Markdown",
+            reply_markup=DepositKeyboards.deposit_amounts()
+        )
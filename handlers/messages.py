@@ -1,8 +1,10 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.users import UserDB
-from database.payments import PaymentDB
+from database.payments import PaymentsDB
+from database.utrs import seen_utrs
 from config import ADMIN_IDS, UPI_ID
+from utils.validators import Validators
 from keyboards.main import MainKeyboards
 from keyboards.deposit import DepositKeyboards
 
@@ -27,12 +29,12 @@ class MessageHandler:
                     return
                 
                 # Process payment creation
-                user_data = UserDB.get_user(user.id)
+                user_data = await UserDB.get_user(user.id)
                 if not user_data:
                     await update.message.reply_text("Please use /start first.")
                     return
                 
-                payment_id = PaymentDB.create_payment(user_data['id'], amount)
+                payment_id = await PaymentsDB.create_payment(user.id, amount)
                 if not payment_id:
                     await update.message.reply_text(
                         "❌ Failed to create payment. Please try again.",
@@ -40,17 +42,10 @@ class MessageHandler:
                     )
                     return
                 
-                # Generate QR code
+                # Send QR code
                 from services.payment import PaymentService
-                qr_image = PaymentService.generate_qr_code(amount, payment_id)
                 instructions = PaymentService.get_payment_instructions(payment_id, amount)
-                
-                # Send QR code
-                await update.message.reply_photo(
-                    photo=qr_image,
-                    caption=instructions,
-                    parse_mode="Markdown"
-                )
+                await PaymentService.send_qr_code(update.message, amount, payment_id, instructions)
                 
                 await update.message.reply_text(
                     f"**Payment Created**\n\n"
@@ -67,7 +62,7 @@ class MessageHandler:
                 context.user_data['payment_info'] = {
                     'payment_id': payment_id,
                     'amount': amount,
-                    'user_id': user_data['id']
+                    'user_id': user.id
                 }
                 del context.user_data['awaiting_deposit_amount']
                 
@@ -83,11 +78,24 @@ class MessageHandler:
             payment_info = context.user_data['payment_info']
             payment_id = payment_info['payment_id']
             
-            # Verify payment with UTR
-            success, message = PaymentDB.verify_payment(payment_id, text)
+            valid, message = Validators.validate_utr(text)
+            if not valid:
+                await update.message.reply_text(
+                    f"❌ {message}\nPlease send the UTR of your payment:",
+                    reply_markup=MainKeyboards.back_button("main_menu")
+                )
+                return
+            
+            # Verify payment with UTR; this also credits the balance. Known
+            # UTRs are refused from memory, expiry is checked by the update
+            success = await PaymentsDB.verify_utr(payment_id, text)
+            if text in seen_utrs:
+                message = "This UTR has already been used."
+            else:
+                message = "This payment has expired or is no longer pending. Please create a new deposit."
             
             if success:
-                user_data = UserDB.get_user_by_id(payment_info['user_id'])
+                user_data = await UserDB.get_user(payment_info['user_id'])
                 await update.message.reply_text(
                     f"✅ **Payment Verified!**\n\n"
                     f"**Amount:** ₹{payment_info['amount']}\n"
@@ -1,7 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.users import UserDB
-from database.orders import OrderDB
+from database.orders import OrdersDB
 from datetime import datetime
 from keyboards.main import MainKeyboards
 
@@ -13,13 +13,13 @@ class MyNumbersHandler:
         await query.answer()
         
         user = query.from_user
-        user_data = UserDB.get_user(user.id)
+        user_data = await UserDB.get_user(user.id)
         
         if not user_data:
             await query.edit_message_text("Please use /start first.")
             return
         
-        orders = OrderDB.get_user_orders(user_data['id'])
+        orders = await OrdersDB.get_active_orders(user.id)
         
         if not orders:
             await query.edit_message_text(
@@ -32,7 +32,7 @@ class MyNumbersHandler:
         
         numbers_text = "**Your Active Numbers:**\n\n"
         for order in orders:
-            expiry = datetime.fromisoformat(order['expiry_date']) if order['expiry_date'] else None
+            expiry = datetime.fromisoformat(order['expires_at']) if order['expires_at'] else None
             if expiry:
                 time_left = expiry - datetime.now()
                 minutes_left = max(0, int(time_left.total_seconds() / 60))
@@ -40,9 +40,11 @@ class MyNumbersHandler:
             else:
                 expiry_text = "⏰ Expiry: Unknown"
             
+            otp_text = f"🔐 OTP: `{order['otp_code']}`\n" if order['otp_code'] else ""
             numbers_text += (
-                f"📞 `{order['number']}`\n"
-                f"🌍 {order['country_flag']} {order['country_name']}\n"
+                f"📞 `{order['phone_number']}`\n"
+                f"🌍 {order['country_name'] or order['country_code']}\n"
+                f"{otp_text}"
                 f"{expiry_text}\n"
                 f"━━━━━━━━━━━━━━\n"
             )
@@ -10,10 +10,8 @@ class StartHandler:
         """Handle /start command"""
         user = update.effective_user
         
-        # Register user if not exists
-        existing_user = UserDB.get_user(user.id)
-        if not existing_user:
-            UserDB.create_user(user.id, user.username)
+        # Register the user, refreshing their username if it changed
+        await UserDB.register(user.id, user.username)
         
         await update.message.reply_text(
             WELCOME_MESSAGE,
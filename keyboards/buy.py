@@ -1,40 +1,54 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database.countries import CountryDB
-from database.numbers import NumberDB
-from config import COUNTRY_RATES
+from database.countries import CountriesDB
+from database.numbers import NumbersDB
+from database.inventory import inventory
+from config import KEYBOARD_CACHE_TTL
+from utils.cache import TTLCache
+
+# The country list only changes with prices, listings or stock, all of
+# which notify the inventory index, so it is rebuilt on demand after that.
+_countries_menu_cache = TTLCache(maxsize=1, ttl=KEYBOARD_CACHE_TTL)
+inventory.on_change(lambda country_code: _countries_menu_cache.clear())
 
 class BuyKeyboards:
     @staticmethod
-    def countries_menu():
-        countries = CountryDB.get_all_countries()
+    def cache_stats():
+        """Country menu cache hit/miss counters"""
+        return _countries_menu_cache.stats()
+    
+    @staticmethod
+    async def countries_menu():
+        cached = _countries_menu_cache.get("countries")
+        if cached:
+            return cached
+        
+        countries = await CountriesDB.get_countries_with_stock()
         keyboard = []
         
         for country in countries:
-            numbers = NumberDB.get_available_numbers(country['id'], limit=1)
-            price = COUNTRY_RATES.get(country['name'], 10)
-            btn_text = f"{country['flag']} {country['name']} - ₹{price} ({len(numbers)} available)"
+            btn_text = f"{country['country_name']} - ₹{country['price']} ({country['available']} available)"
             keyboard.append([
-                InlineKeyboardButton(btn_text, callback_data=f"country_{country['id']}")
+                InlineKeyboardButton(btn_text, callback_data=f"country_{country['country_code']}")
             ])
         
         keyboard.append([
             InlineKeyboardButton("🔙 Main Menu", callback_data="main_menu")
         ])
         
-        return InlineKeyboardMarkup(keyboard)
+        markup = InlineKeyboardMarkup(keyboard)
+        _countries_menu_cache.set("countries", markup)
+        return markup
     
     @staticmethod
-    def numbers_menu(country_id):
-        numbers = NumberDB.get_available_numbers(country_id, limit=15)
-        country = CountryDB.get_country(country_id)
-        price = COUNTRY_RATES.get(country['name'], 10)
+    async def numbers_menu(country_code, price):
+        numbers = await NumbersDB.get_available_numbers(country_code, limit=15)
         
         keyboard = []
         for number in numbers:
             keyboard.append([
                 InlineKeyboardButton(
-                    f"📞 {number['number']} - ₹{price}",
-                    callback_data=f"select_number_{number['id']}"
+                    f"📞 {number['phone_number']} - ₹{price}",
+                    callback_data=f"select_number_{number['number_id']}"
                 )
             ])
         
@@ -1,18 +1,23 @@
+from functools import lru_cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+# Static keyboards are built once; InlineKeyboardMarkup is immutable, so
+# the same object can be sent with every reply.
+_MAIN_MENU = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🛒 Buy Number", callback_data="buy_number")],
+    [InlineKeyboardButton("💰 Deposit", callback_data="deposit")],
+    [InlineKeyboardButton("📊 Balance", callback_data="balance")],
+    [InlineKeyboardButton("📱 My Numbers", callback_data="my_numbers")],
+    [InlineKeyboardButton("🆘 Help", callback_data="help")]
+])
+
 class MainKeyboards:
     @staticmethod
     def main_menu():
-        keyboard = [
-            [InlineKeyboardButton("🛒 Buy Number", callback_data="buy_number")],
-            [InlineKeyboardButton("💰 Deposit", callback_data="deposit")],
-            [InlineKeyboardButton("📊 Balance", callback_data="balance")],
-            [InlineKeyboardButton("📱 My Numbers", callback_data="my_numbers")],
-            [InlineKeyboardButton("🆘 Help", callback_data="help")]
-        ]
-        return InlineKeyboardMarkup(keyboard)
+        return _MAIN_MENU
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def back_button(back_to="main_menu"):
         keyboard = [[InlineKeyboardButton("🔙 Back", callback_data=back_to)]]
         return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
@@ -1,35 +1,101 @@
+import asyncio
+import time
 from datetime import datetime
-from database.numbers import NumberDB
-from database.payments import PaymentDB
-from database.orders import OrderDB
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from database.numbers import NumbersDB
+from database.payments import PaymentsDB
+from database.orders import OrdersDB
+from database.accounts import AccountsDB
+from services.expiry import expiry_scheduler
+from services.client_pool import client_pool
+from services.otp import otp_pipeline
+from config import CLEANUP_CHUNK_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CleanupService:
     @staticmethod
-    def run_cleanup():
-        """Run all cleanup tasks"""
+    async def _sweep(expire: Callable[[datetime, int], Awaitable[list]], now: datetime) -> Dict[str, Any]:
+        """Run a set-based expiry in bounded chunks until nothing is due"""
+        started = time.perf_counter()
+        rows: List[Dict[str, Any]] = []
+        chunks = 0
+        while True:
+            chunk = await expire(now, CLEANUP_CHUNK_SIZE)
+            chunks += 1
+            rows.extend(chunk)
+            if len(chunk) < CLEANUP_CHUNK_SIZE:
+                break
+            # Let user traffic in between chunks
+            await asyncio.sleep(0)
+        return {
+            'rows': rows,
+            'expired': len(rows),
+            'chunks': chunks,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    @staticmethod
+    async def expire_numbers(now: datetime) -> Dict[str, Any]:
+        """Return every number whose rental has ended to the pool"""
+        numbers = await CleanupService._sweep(NumbersDB.expire_due, now)
+        numbers.pop('rows')
+        if numbers['expired']:
+            logger.info(f"Expired {numbers['expired']} numbers")
+        return numbers
+
+    @staticmethod
+    async def expire_orders(now: datetime) -> Dict[str, Any]:
+        """Expire due orders and free the accounts they held"""
+        orders = await CleanupService._sweep(OrdersDB.expire_due, now)
+        account_ids = [row['account_id'] for row in orders.pop('rows') if row['account_id']]
+        await AccountsDB.release_accounts(account_ids)
+        for account_id in account_ids:
+            otp_pipeline.unbind(account_id)
+            client_pool.release(account_id)
+        orders['released_accounts'] = len(account_ids)
+        if orders['expired']:
+            logger.info(f"Expired {orders['expired']} orders")
+        return orders
+
+    @staticmethod
+    async def expire_payments(now: datetime) -> Dict[str, Any]:
+        """Expire pending payments past their deadline"""
+        payments = await CleanupService._sweep(PaymentsDB.expire_due, now)
+        payments.pop('rows')
+        if payments['expired']:
+            logger.info(f"Expired {payments['expired']} payments")
+        return payments
+
+    @staticmethod
+    async def start_scheduler():
+        """Load pending deadlines into the expiry scheduler and start it"""
+        expiry_scheduler.register('numbers', CleanupService.expire_numbers)
+        expiry_scheduler.register('orders', CleanupService.expire_orders)
+        expiry_scheduler.register('payments', CleanupService.expire_payments)
+
+        for expires_at in await NumbersDB.get_expiry_deadlines():
+            expiry_scheduler.schedule('numbers', expires_at)
+        for expires_at in await OrdersDB.get_expiry_deadlines():
+            expiry_scheduler.schedule('orders', expires_at)
+        for expires_at in await PaymentsDB.get_expiry_deadlines():
+            expiry_scheduler.schedule('payments', expires_at)
+
+        expiry_scheduler.start()
+        logger.info(f"Expiry scheduler started with {expiry_scheduler.stats()['pending']} deadlines")
+
+    @staticmethod
+    async def run_cleanup() -> Optional[Dict[str, Any]]:
+        """Reconciliation sweep for anything the expiry scheduler missed"""
         try:
-            # Clean expired numbers
-            expired_numbers = NumberDB.expire_numbers()
-            if expired_numbers > 0:
-                logger.info(f"Expired {expired_numbers} numbers")
-            
-            # Clean expired payments
-            expired_payments = PaymentDB.clean_expired_payments()
-            if expired_payments > 0:
-                logger.info(f"Cleaned {expired_payments} expired payments")
-            
-            # Clean expired orders
-            expired_orders = OrderDB.expire_old_orders()
-            if expired_orders > 0:
-                logger.info(f"Expired {expired_orders} old orders")
-            
+            started = time.perf_counter()
+            now = datetime.now()
             return {
-                'expired_numbers': expired_numbers,
-                'expired_payments': expired_payments,
-                'expired_orders': expired_orders
+                'numbers': await CleanupService.expire_numbers(now),
+                'orders': await CleanupService.expire_orders(now),
+                'payments': await CleanupService.expire_payments(now),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
             }
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+from pyrogram import Client
+from database.accounts import AccountsDB
+from config import API_ID, API_HASH, CLIENT_POOL_SIZE, CLIENT_IDLE_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AccountClientPool:
+    """Live pyrogram clients for session accounts, started on first use.
+
+    Clients stay connected after use and are evicted least-recently-used
+    first once the pool is over capacity, or after sitting idle for
+    idle_timeout seconds. Pinned clients (accounts serving an active
+    order) are never evicted.
+    """
+
+    def __init__(self, max_clients: int = CLIENT_POOL_SIZE, idle_timeout: int = CLIENT_IDLE_TIMEOUT):
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self._clients: "OrderedDict[int, Client]" = OrderedDict()
+        self._last_used: Dict[int, float] = {}
+        self._pinned = set()
+        self._starting: Dict[int, asyncio.Task] = {}
+        self._warming = set()  # background starts, referenced until done
+        self._on_start: List[Callable[[int, Client], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._start_latencies = deque(maxlen=100)
+
+    def on_start(self, callback: Callable[[int, Client], None]):
+        """Register a callback run on every new client before it connects"""
+        self._on_start.append(callback)
+
+    async def get(self, account_id: int, pin: bool = False) -> Optional[Client]:
+        """Get a connected client for an account, starting it if needed"""
+        if pin:
+            self._pinned.add(account_id)
+
+        client = self._clients.get(account_id)
+        if client:
+            self.hits += 1
+            self._touch(account_id)
+            return client
+
+        self.misses += 1
+        task = self._starting.get(account_id)
+        if not task:
+            # Concurrent callers for the same account share one start
+            task = asyncio.create_task(self._start(account_id))
+            self._starting[account_id] = task
+            task.add_done_callback(lambda _: self._starting.pop(account_id, None))
+        client = None
+        try:
+            client = await asyncio.shield(task)
+            return client
+        finally:
+            if pin and client is None:
+                # A client that never started serves no order
+                self._pinned.discard(account_id)
+
+    def warm(self, account_id: int):
+        """Start and pin an account's client in the background"""
+        task = asyncio.create_task(self.get(account_id, pin=True))
+        self._warming.add(task)
+        task.add_done_callback(self._warmed)
+
+    def _warmed(self, task: asyncio.Task):
+        self._warming.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error warming account client: {task.exception()}")
+
+    def release(self, account_id: int):
+        """Unpin an account so it becomes evictable again"""
+        self._pinned.discard(account_id)
+
+    def _touch(self, account_id: int):
+        self._clients.move_to_end(account_id)
+        self._last_used[account_id] = time.monotonic()
+
+    async def _start(self, account_id: int) -> Optional[Client]:
+        account = await AccountsDB.get_account(account_id)
+        if not account or not account['is_active']:
+            logger.warning(f"Account {account_id} is missing or disabled")
+            return None
+
+        client = Client(
+            f"account_{account_id}",
+            api_id=API_ID,
+            api_hash=API_HASH,
+            session_string=account['session_string'],
+            in_memory=True,
+        )
+        for callback in self._on_start:
+            callback(account_id, client)
+
+        started = time.perf_counter()
+        try:
+            await client.start()
+        except Exception as e:
+            logger.error(f"Error starting client for account {account_id}: {e}")
+            return None
+        self._start_latencies.append(time.perf_counter() - started)
+
+        self._clients[account_id] = client
+        self._touch(account_id)
+        await self._evict_over_capacity()
+        return client
+
+    async def _stop(self, account_id: int):
+        client = self._clients.pop(account_id, None)
+        self._last_used.pop(account_id, None)
+        if not client:
+            return
+        self.evictions += 1
+        try:
+            await client.stop()
+        except Exception as e:
+            logger.error(f"Error stopping client for account {account_id}: {e}")
+
+    async def _evict_over_capacity(self):
+        # Iterate oldest first; pinned clients are skipped, not counted out
+        for account_id in list(self._clients):
+            if len(self._clients) <= self.max_clients:
+                break
+            if account_id not in self._pinned:
+                await self._stop(account_id)
+
+    async def evict_idle(self) -> int:
+        """Stop unpinned clients idle for longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [
+            account_id for account_id, last_used in self._last_used.items()
+            if last_used < cutoff and account_id not in self._pinned
+        ]
+        for account_id in idle:
+            await self._stop(account_id)
+        return len(idle)
+
+    async def close(self):
+        """Stop every client"""
+        for task in list(self._warming):
+            task.cancel()
+        for account_id in list(self._clients):
+            await self._stop(account_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, hit rate and client start latency"""
+        lookups = self.hits + self.misses
+        latencies = self._start_latencies
+        return {
+            'clients': len(self._clients),
+            'max_clients': self.max_clients,
+            'pinned': len(self._pinned),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            'evictions': self.evictions,
+            'avg_start_ms': (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+            'max_start_ms': max(latencies) * 1000 if latencies else 0.0,
+        }
+
+# Global client pool
+client_pool = AccountClientPool()
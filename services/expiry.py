@@ -0,0 +1,102 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExpiryScheduler:
+    """Min-heap of expiry deadlines, fired as soon as each one passes.
+
+    Entries only carry a kind ("numbers", "orders", "payments"). When a
+    deadline passes, the handler for its kind runs one indexed sweep that
+    expires everything due, so renewed or released rows need no
+    cancellation and bursts of equal deadlines collapse into one sweep.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._handlers: Dict[str, Callable[[datetime], Awaitable[Any]]] = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.scheduled = 0
+        self.fired = 0
+        self.max_lag = 0.0
+
+    def register(self, kind: str, handler: Callable[[datetime], Awaitable[Any]]):
+        """Set the coroutine that expires due rows of a kind"""
+        self._handlers[kind] = handler
+
+    def schedule(self, kind: str, expires_at: datetime):
+        """Fire the handler for `kind` once `expires_at` has passed"""
+        deadline = expires_at.timestamp()
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (deadline, next(self._seq), kind))
+        self.scheduled += 1
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the scheduler task"""
+        if not self._task:
+            # Loop-bound, so made per start; _run checks the heap first anyway
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            due = set()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, kind = heapq.heappop(self._heap)
+                self.max_lag = max(self.max_lag, now - deadline)
+                due.add(kind)
+
+            for kind in due:
+                handler = self._handlers.get(kind)
+                if not handler:
+                    continue
+                try:
+                    await handler(datetime.now())
+                    self.fired += 1
+                except Exception as e:
+                    logger.error(f"Expiry handler for {kind} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler metrics"""
+        return {
+            'pending': len(self._heap),
+            'scheduled': self.scheduled,
+            'fired': self.fired,
+            'max_lag_ms': round(self.max_lag * 1000, 2),
+        }
+
+# Global expiry scheduler
+expiry_scheduler = ExpiryScheduler()
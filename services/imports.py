@@ -0,0 +1,203 @@
+import asyncio
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from database.numbers import NumbersDB
+from database.countries import CountriesDB
+from database.accounts import AccountsDB
+from utils.validators import Validators
+from config import IMPORT_CHUNK_SIZE, SESSION_FOLDER, SESSION_IMPORT_WORKERS
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FIELD_SEPARATOR = re.compile(r"[,;\s]+")
+
+def _list_session_files(source: str) -> List[Tuple[str, Callable[[], bytes]]]:
+    """List (name, reader) pairs for every file in a folder, zip archive or single file"""
+    if zipfile.is_zipfile(source):
+        # Session files are small, so the archive is read up front
+        with zipfile.ZipFile(source) as archive:
+            return [
+                (info.filename, lambda data=archive.read(info.filename): data)
+                for info in archive.infolist() if not info.is_dir()
+            ]
+
+    def reader(path):
+        def read():
+            with open(path, 'rb') as f:
+                return f.read()
+        return read
+
+    if os.path.isfile(source):
+        return [(os.path.basename(source), reader(source))]
+    files = []
+    for root, _, names in os.walk(source):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, source), reader(path)))
+    return files
+
+def _read_session_file(data: bytes) -> List[str]:
+    """Export the session string stored in a Pyrogram .session database"""
+    with tempfile.NamedTemporaryFile(suffix=".session") as f:
+        f.write(data)
+        f.flush()
+        conn = sqlite3.connect(f.name)
+        try:
+            rows = conn.execute(
+                "SELECT dc_id, api_id, test_mode, auth_key, user_id, is_bot FROM sessions"
+            ).fetchall()
+        finally:
+            conn.close()
+    return [Validators.encode_session_string(*row) for row in rows if row[3] and row[4]]
+
+def _validate_session_file(name: str, read: Callable[[], bytes]) -> List[Dict[str, Any]]:
+    """Read one file and validate every session string in it"""
+    try:
+        data = read()
+        if name.endswith(".session"):
+            entries = [(name, session) for session in _read_session_file(data)]
+        else:
+            lines = data.decode("utf-8", errors="replace").splitlines()
+            entries = [
+                (f"{name}:{number}", line.strip())
+                for number, line in enumerate(lines, 1) if line.strip()
+            ]
+    except Exception as e:
+        return [{'source': name, 'status': 'invalid', 'reason': f"Unreadable file: {e}"}]
+
+    results = []
+    for source, session_string in entries:
+        valid, reason = Validators.validate_session_string(session_string)
+        item = {'source': source, 'status': 'valid' if valid else 'invalid', 'reason': '' if valid else reason}
+        if valid:
+            session = Validators.decode_session_string(session_string)
+            item.update(session_string=session_string, dc_id=session['dc_id'], user_id=session['user_id'])
+        results.append(item)
+    return results
+
+class ImportService:
+    @staticmethod
+    async def import_numbers(lines: Iterable[str], country_code: Optional[str] = None,
+                             chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Stream numbers into the inventory in chunked transactions.
+
+        Each line is either "COUNTRY,+number" or, when `country_code` is
+        given, just "+number". Lines can come from a file or a generator.
+        """
+        started = time.perf_counter()
+        countries = {country['country_code'] for country in await CountriesDB.get_all_countries()}
+        report = {'rows': 0, 'inserted': 0, 'duplicate': 0, 'invalid': 0, 'unknown_country': 0, 'chunks': 0}
+        chunk: List[Tuple[str, str]] = []
+
+        async def flush():
+            inserted = await NumbersDB.insert_many(chunk)
+            report['inserted'] += inserted
+            report['duplicate'] += len(chunk) - inserted
+            report['chunks'] += 1
+            chunk.clear()
+            # Let queued user writes through between chunks
+            await asyncio.sleep(0)
+
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            report['rows'] += 1
+            fields = _FIELD_SEPARATOR.split(line)
+            if len(fields) == 1 and country_code:
+                code, phone = country_code, fields[0]
+            elif len(fields) == 2:
+                code, phone = fields
+            else:
+                report['invalid'] += 1
+                continue
+
+            code = code.upper()
+            valid, _ = Validators.validate_phone_number(phone)
+            if not valid:
+                report['invalid'] += 1
+                continue
+            if code not in countries:
+                report['unknown_country'] += 1
+                continue
+
+            chunk.append((code, phone))
+            if len(chunk) >= chunk_size:
+                await flush()
+        if chunk:
+            await flush()
+
+        duration = time.perf_counter() - started
+        report['duration_ms'] = round(duration * 1000, 2)
+        report['rows_per_sec'] = round(report['rows'] / duration) if duration else 0
+        logger.info(f"Number import: {report}")
+        return report
+
+    @staticmethod
+    async def import_sessions(source: str = SESSION_FOLDER, workers: int = SESSION_IMPORT_WORKERS,
+                              chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Validate session files in parallel and add the good ones as accounts.
+
+        `source` is a folder, a zip archive or a single file. .session
+        files are read as Pyrogram session databases; any other file holds
+        one session string per line. Every entry gets a result item.
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session-import") as executor:
+            files = await loop.run_in_executor(executor, _list_session_files, source)
+            results = await asyncio.gather(*[
+                loop.run_in_executor(executor, _validate_session_file, name, read)
+                for name, read in files
+            ])
+        items = [item for result in results for item in result]
+
+        # The same Telegram user twice in one import is one account
+        valid = []
+        user_ids = set()
+        for item in items:
+            if item['status'] != 'valid':
+                continue
+            if item['user_id'] in user_ids:
+                item.update(status='duplicate', reason="Same user as an earlier entry")
+                continue
+            user_ids.add(item['user_id'])
+            valid.append(item)
+
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            added = {
+                row['session_string']: row['account_id']
+                for row in await AccountsDB.add_many([(item['session_string'], None) for item in chunk])
+            }
+            for item in chunk:
+                account_id = added.get(item['session_string'])
+                if account_id:
+                    item.update(status='added', account_id=account_id)
+                else:
+                    item.update(status='duplicate', reason="Session already imported")
+            await asyncio.sleep(0)
+
+        for item in items:
+            item.pop('session_string', None)
+        duration = time.perf_counter() - started
+        report = {
+            'files': len(files),
+            'items': items,
+            'added': sum(item['status'] == 'added' for item in items),
+            'duplicate': sum(item['status'] == 'duplicate' for item in items),
+            'invalid': sum(item['status'] == 'invalid' for item in items),
+            'duration_ms': round(duration * 1000, 2),
+        }
+        logger.info(
+            f"Session import from {source}: {report['added']} added, "
+            f"{report['duplicate']} duplicate, {report['invalid']} invalid in {report['duration_ms']} ms"
+        )
+        return report
@@ -0,0 +1,135 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Any, Dict, Tuple
+from pyrogram import filters
+from pyrogram.handlers import MessageHandler
+from database.orders import OrdersDB
+from config import OTP_REGEX, OTP_QUEUE_SIZE, OTP_WORKERS
+import logging
+
+logger = logging.getLogger(__name__)
+
+OTP_PATTERN = re.compile(OTP_REGEX)
+
+# Login codes are sent to the account by Telegram's service user
+TELEGRAM_SERVICE_ID = 777000
+
+class OtpPipeline:
+    """Routes account messages to their order's buyer.
+
+    Client message handlers only enqueue; a fixed pool of workers matches
+    the OTP, stores it on the order and forwards it to the buyer. The
+    account -> order route is held in memory and maintained on purchase
+    and expiry.
+    """
+
+    def __init__(self, workers: int = OTP_WORKERS, max_queue: int = OTP_QUEUE_SIZE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue = None
+        self._tasks = []
+        self._bot = None
+        self._routes: Dict[int, Tuple[int, int]] = {}  # account_id -> (order_id, user_id)
+        self.received = 0
+        self.dropped = 0
+        self.unrouted = 0
+        self.delivered = 0
+        self._latencies = deque(maxlen=500)
+
+    def bind(self, account_id: int, order_id: int, user_id: int):
+        """Route an account's OTPs to an order"""
+        self._routes[account_id] = (order_id, user_id)
+
+    def unbind(self, account_id: int):
+        """Stop routing an account's messages"""
+        self._routes.pop(account_id, None)
+
+    async def load(self) -> list:
+        """Rebuild routes from active orders, returning their account ids"""
+        orders = await OrdersDB.get_active_routes()
+        for order in orders:
+            self.bind(order['account_id'], order['order_id'], order['user_id'])
+        return [order['account_id'] for order in orders]
+
+    def attach(self, account_id: int, client):
+        """Add the enqueueing message handler to an account client"""
+        async def on_message(_, message):
+            self.submit(account_id, message.text or message.caption or "")
+
+        client.add_handler(MessageHandler(on_message, filters.incoming & filters.user(TELEGRAM_SERVICE_ID)))
+
+    def submit(self, account_id: int, text: str):
+        """Queue a message without blocking the client's update loop"""
+        self.received += 1
+        if account_id not in self._routes:
+            self.unrouted += 1
+            return
+        try:
+            self._queue.put_nowait((account_id, text, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"OTP queue full, dropped message for account {account_id}")
+
+    def start(self, bot):
+        """Start the worker pool"""
+        self._bot = bot
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the worker pool"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            account_id, text, received_at = await self._queue.get()
+            try:
+                await self._process(account_id, text, received_at)
+            except Exception as e:
+                logger.error(f"Error processing OTP for account {account_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, account_id: int, text: str, received_at: float):
+        route = self._routes.get(account_id)
+        if not route:
+            self.unrouted += 1
+            return
+        match = OTP_PATTERN.search(text)
+        if not match:
+            return
+
+        order_id, user_id = route
+        otp_code = match.group(0)
+        await OrdersDB.update_otp(order_id, otp_code)
+        await self._bot.send_message(
+            user_id,
+            f"🔐 **OTP Received**\n\n"
+            f"**Code:** `{otp_code}`\n"
+            f"**Order:** #{order_id}",
+            parse_mode="Markdown"
+        )
+        self.delivered += 1
+        self._latencies.append(time.perf_counter() - received_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and end-to-end OTP latency"""
+        latencies = sorted(self._latencies)
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'routes': len(self._routes),
+            'received': self.received,
+            'dropped': self.dropped,
+            'unrouted': self.unrouted,
+            'delivered': self.delivered,
+            'avg_latency_ms': (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+            'p95_latency_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0.0,
+        }
+
+# Global OTP pipeline
+otp_pipeline = OtpPipeline()
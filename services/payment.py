@@ -1,29 +1,54 @@
+import asyncio
 import qrcode
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from config import UPI_ID, PAYMENT_TIMEOUT
+from config import UPI_ID, PAYMENT_TIMEOUT, QR_WORKERS
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every QR carries its own payment id (statement imports match on it), so
+# each one is rendered and uploaded once; there is nothing to cache
+_qr_executor = ThreadPoolExecutor(max_workers=QR_WORKERS, thread_name_prefix="qr")
+
+def _render_qr(upi_url):
+    """Render a UPI url to PNG bytes"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(upi_url)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    bio = BytesIO()
+    img.save(bio, "PNG")
+    return bio.getvalue()
 
 class PaymentService:
+    @staticmethod
+    def get_upi_url(amount, payment_id):
+        """Build the UPI payment url for a QR code"""
+        note = f"Payment ID: {payment_id}"
+        return f"upi://pay?pa={UPI_ID}&pn=Virtual%20Numbers&am={amount}&tn={note}&cu=INR"
+    
     @staticmethod
     def generate_qr_code(amount, payment_id):
         """Generate UPI QR code"""
-        upi_url = f"upi://pay?pa={UPI_ID}&pn=Virtual%20Numbers&am={amount}&tn=Payment ID: {payment_id}&cu=INR"
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(upi_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        bio = BytesIO()
-        img.save(bio, "PNG")
-        bio.seek(0)
+        return BytesIO(_render_qr(PaymentService.get_upi_url(amount, payment_id)))
+    
+    @staticmethod
+    async def send_qr_code(message, amount, payment_id, caption):
+        """Reply with the payment QR"""
+        upi_url = PaymentService.get_upi_url(amount, payment_id)
         
-        return bio
+        # Rendering and PNG encoding stay off the event loop
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(_qr_executor, _render_qr, upi_url)
+        return await message.reply_photo(photo=png, caption=caption, parse_mode="Markdown")
     
     @staticmethod
     def get_payment_instructions(payment_id, amount):
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from database.db import db, Statement
+from database.inventory import inventory
+from database.reservations import account_queue
+from database.users import user_cache, user_fills
+from database.ledger import TOTALS, APPEND, PURCHASE, to_paise, from_paise, apply_entry
+from database.accounts import CLAIM_ACCOUNT, CLAIM_NEXT_ACCOUNT
+from database.countries import GET_COUNTRY
+from services.expiry import expiry_scheduler
+from services.otp import otp_pipeline
+from config import NUMBER_DURATION
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PurchaseError(Exception):
+    """Aborts the purchase transaction with a reason for the caller"""
+    def __init__(self, reason: str, **details):
+        super().__init__(reason)
+        self.reason = reason
+        self.details = details
+
+CLAIM_NUMBER = db.prepare("purchase.claim_number", """UPDATE numbers
+    SET is_assigned = 1,
+        assigned_to = ?,
+        assigned_at = CURRENT_TIMESTAMP,
+        expires_at = ?
+    WHERE number_id = ? AND is_assigned = 0
+    RETURNING number_id, phone_number, country_code""")
+
+CREATE_ORDER = db.prepare("purchase.create_order", """INSERT INTO orders
+    (user_id, number_id, account_id, price, expires_at)
+    VALUES (?, ?, ?, ?, ?)
+    RETURNING order_id""")
+
+async def _fetch_one(conn, query: Statement, params: tuple = ()):
+    rows = await db.run(conn, query, params)
+    return rows[0] if rows else None
+
+class PurchaseService:
+    @staticmethod
+    async def purchase(user_id: int, number_id: int) -> Dict[str, Any]:
+        """Debit, assign number, reserve account and create order atomically"""
+        # A cache fill overlapping the purchase would miss the debit patch
+        with user_fills.writing(user_id):
+            return await PurchaseService._purchase(user_id, number_id)
+
+    @staticmethod
+    async def _purchase(user_id: int, number_id: int) -> Dict[str, Any]:
+        expires_at = datetime.now() + timedelta(seconds=NUMBER_DURATION)
+        claimed = None
+        try:
+            async with db.transaction() as conn:
+                # Claiming the number first makes a second buyer fail here
+                # instead of both passing a read-then-write check.
+                number = await _fetch_one(conn, CLAIM_NUMBER, (user_id, expires_at, number_id))
+                if not number:
+                    raise PurchaseError("number_unavailable")
+                # A correlated subquery in RETURNING cannot use the country
+                # index, so the price is a separate lookup by country_code
+                country = await _fetch_one(conn, GET_COUNTRY, (number['country_code'],))
+                if not country:
+                    raise PurchaseError("country_unavailable")
+                price = country['price']
+
+                # The write lock is held, so the balance cannot change
+                # between this read and the debit below
+                totals = await _fetch_one(conn, TOTALS, (user_id,))
+                if not totals:
+                    raise PurchaseError("user_not_found")
+                debit = to_paise(price)
+                if totals['balance'] < debit:
+                    raise PurchaseError("insufficient_balance", price=price, balance=from_paise(totals['balance']))
+
+                account = None
+                while not account:
+                    claimed = account_queue.pop()
+                    if not claimed:
+                        break
+                    account = await _fetch_one(conn, CLAIM_ACCOUNT, (claimed[2],))
+                if not account:
+                    account = await _fetch_one(conn, CLAIM_NEXT_ACCOUNT)
+                    if not account:
+                        raise PurchaseError("no_account", country_name=country['country_name'])
+                    account_queue.discard(account['account_id'])
+
+                order = await _fetch_one(
+                    conn, CREATE_ORDER, (user_id, number_id, account['account_id'], price, expires_at)
+                )
+                await db.run(conn, APPEND, (user_id, -debit, PURCHASE, order['order_id']))
+        except PurchaseError as e:
+            return {'success': False, 'error': e.reason, **e.details}
+        except Exception as e:
+            logger.error(f"Error processing purchase: {e}")
+            # The account claim was rolled back with everything else
+            if claimed:
+                account_queue.restore(claimed)
+            return {'success': False, 'error': 'failed'}
+
+        user = user_cache.peek(user_id)
+        if user:
+            apply_entry(user, PURCHASE, -debit)
+        inventory.remove(number_id)
+        expiry_scheduler.schedule('numbers', expires_at)
+        expiry_scheduler.schedule('orders', expires_at)
+        otp_pipeline.bind(account['account_id'], order['order_id'], user_id)
+        logger.info(f"Created order #{order['order_id']} for user {user_id}")
+        return {
+            'success': True,
+            'order_id': order['order_id'],
+            'number_id': number['number_id'],
+            'phone_number': number['phone_number'],
+            'country_code': number['country_code'],
+            'country_name': country['country_name'],
+            'account_id': account['account_id'],
+            'price': price,
+            'balance': from_paise(totals['balance'] - debit),
+            'expires_at': expires_at,
+        }
@@ -0,0 +1,131 @@
+import csv
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from database.payments import PaymentsDB
+from database.utrs import seen_utrs
+from database.ledger import to_paise, from_paise
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Header names used by common bank statement exports (lower-cased)
+UTR_COLUMNS = ('utr', 'utr no', 'utr number', 'rrn', 'reference', 'reference no', 'ref no', 'transaction id')
+CREDIT_COLUMNS = ('credit', 'credit amount', 'cr amount', 'deposit', 'deposit amount', 'deposit amt', 'deposit amt.')
+# A single amount column is only usable next to a Dr/Cr indicator
+AMOUNT_COLUMNS = ('amount', 'amount (inr)', 'transaction amount', 'txn amount')
+TYPE_COLUMNS = ('dr/cr', 'cr/dr', 'dr / cr', 'type', 'transaction type', 'txn type', 'debit/credit')
+CREDIT_MARKS = ('cr', 'credit', 'c')
+REMARK_COLUMNS = ('remarks', 'description', 'narration', 'note', 'details', 'particulars')
+
+# Matches the note on deposit UPI QR codes ("Payment ID: 42")
+PAYMENT_ID_PATTERN = re.compile(r"payment\s*id\W*(\d+)", re.IGNORECASE)
+
+def _find_column(header: list, names: tuple) -> Optional[int]:
+    for index, name in enumerate(header):
+        if name.strip().lower() in names:
+            return index
+    return None
+
+def _find_columns(header: list) -> Optional[Tuple[int, int, Optional[int], Optional[int]]]:
+    """(utr, amount, dr/cr, remark) column indexes, or None if `header` is not a usable header"""
+    utr_col = _find_column(header, UTR_COLUMNS)
+    if utr_col is None:
+        return None
+    remark_col = _find_column(header, REMARK_COLUMNS)
+    credit_col = _find_column(header, CREDIT_COLUMNS)
+    if credit_col is not None:
+        return utr_col, credit_col, None, remark_col
+    amount_col = _find_column(header, AMOUNT_COLUMNS)
+    type_col = _find_column(header, TYPE_COLUMNS)
+    if amount_col is None or type_col is None:
+        return None
+    return utr_col, amount_col, type_col, remark_col
+
+def parse_statement(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[int], str]]:
+    """Stream (utr, amount in paise, remark) for the credit rows of a CSV statement.
+
+    The header needs a UTR column and either a credit column or an
+    amount column with a Dr/Cr indicator; rows before it (bank
+    preambles) are skipped. Debit rows (a blank or zero credit cell, or
+    no Cr marker) are skipped too. Credit rows without a usable amount
+    yield None.
+    """
+    reader = csv.reader(lines)
+    columns = None
+    for row in reader:
+        if columns is None:
+            columns = _find_columns(row)
+            continue
+        utr_col, amount_col, type_col, remark_col = columns
+        if len(row) <= max(utr_col, amount_col, type_col or 0):
+            continue
+        utr = row[utr_col].strip()
+        raw_amount = row[amount_col].replace(',', '').strip()
+        try:
+            amount = to_paise(float(raw_amount))
+        except ValueError:
+            amount = None
+        if type_col is None:
+            # Debits leave the credit cell blank or zero
+            is_credit = bool(raw_amount) and amount != 0
+        else:
+            is_credit = row[type_col].strip().lower().rstrip('.') in CREDIT_MARKS
+        if not utr or not is_credit:
+            continue
+        remark = row[remark_col] if remark_col is not None and remark_col < len(row) else ""
+        yield utr, amount, remark
+
+class StatementService:
+    @staticmethod
+    async def import_statement(lines: Iterable[str]) -> Dict[str, Any]:
+        """Match a bank statement against pending payments and credit the matches"""
+        started = time.perf_counter()
+        pending = await PaymentsDB.get_pending_payments()
+
+        # Build side of the hash join: payments by id, amounts for review
+        by_id = {payment['payment_id']: payment for payment in pending}
+        pending_amounts = {to_paise(payment['amount']) for payment in pending}
+
+        report = {'rows': 0, 'matched': 0, 'unmatched': 0, 'duplicate': 0, 'review': 0, 'invalid': 0}
+        review = []
+        matches = []
+        used = set()
+        in_file = set()
+        for utr, amount, remark in parse_statement(lines):
+            report['rows'] += 1
+            if amount is None or amount <= 0:
+                report['invalid'] += 1
+                continue
+            if utr in seen_utrs or utr in in_file:
+                report['duplicate'] += 1
+                continue
+            in_file.add(utr)
+
+            # Only the payment id from the UPI note says who paid; an
+            # amount alone may be anyone's transfer or a refund
+            match = PAYMENT_ID_PATTERN.search(remark)
+            payment = by_id.get(int(match.group(1))) if match else None
+            if payment and payment['payment_id'] not in used and to_paise(payment['amount']) == amount:
+                used.add(payment['payment_id'])
+                matches.append((utr, payment['payment_id']))
+            elif payment or amount in pending_amounts:
+                # Plausibly a deposit, but an admin has to confirm it
+                report['review'] += 1
+                review.append({'utr': utr, 'amount': from_paise(amount), 'remark': remark.strip()})
+            else:
+                report['unmatched'] += 1
+
+        credited, duplicates = await PaymentsDB.complete_many(matches) if matches else ([], 0)
+
+        duration = time.perf_counter() - started
+        report['matched'] = len(credited)
+        report['duplicate'] += duplicates
+        # Matched rows that were no longer pending at commit time
+        report['unmatched'] += len(matches) - len(credited) - duplicates
+        report['credited'] = from_paise(sum(to_paise(row['amount']) for row in credited))
+        report['duration_ms'] = round(duration * 1000, 2)
+        report['rows_per_sec'] = round(report['rows'] / duration) if duration else 0
+        logger.info(f"Statement import: {report}")
+        report['review_items'] = review
+        return report
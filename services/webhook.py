@@ -0,0 +1,73 @@
+import hmac
+from typing import Any, Dict
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Header Telegram echoes the secret_token given to setWebhook in
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """Receives Telegram updates on an embedded aiohttp server.
+
+    Each POST is decoded, put on the application's update queue and
+    acknowledged straight away; handlers run afterwards, so a slow
+    handler never holds Telegram's request open or delays the next one.
+    """
+
+    def __init__(self, application: Application, host: str, port: int, path: str, secret_token: str):
+        if not secret_token:
+            raise ValueError("The webhook server needs a secret token")
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._runner = None
+        self.received = 0
+        self.rejected = 0
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Queue one update and acknowledge it"""
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            update = None
+            logger.warning(f"Rejected malformed webhook update: {e}")
+        if update is None:
+            self.rejected += 1
+            return web.Response(status=400)
+
+        self.received += 1
+        self.application.update_queue.put_nowait(update)
+        return web.Response()
+
+    async def start(self):
+        """Start listening for updates"""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting updates"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Webhook server stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """Updates received, rejected and still waiting for a handler"""
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'queued': self.application.update_queue.qsize(),
+        }
@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Every test run gets a throwaway database; config reads DB_NAME on import
+os.environ["DB_NAME"] = os.path.join(tempfile.mkdtemp(prefix="tests-"), "test.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty database per test, so what the test stocks is all there is"""
+    from database.db import db
+    from database.users import user_cache
+    monkeypatch.setattr(db, 'db_name', str(tmp_path / "fresh.db"))
+    user_cache.clear()
@@ -0,0 +1,131 @@
+"""Drives the user-facing handlers with BlockingCallMonitor installed.
+
+Any handler step that holds the event loop longer than SLOW_CALLBACK_MS
+fails the test, the same way DEBUG_MODE reports it in production.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import handlers.admin
+import handlers.buy
+from config import SLOW_CALLBACK_MS
+from database.db import db
+from database.accounts import AccountsDB
+from database.countries import CountriesDB
+from database.inventory import inventory
+from database.reservations import account_queue
+from database.users import UserDB
+from handlers.admin import AdminHandler
+from handlers.balance import BalanceHandler
+from handlers.buy import BuyHandler
+from handlers.deposit import DepositHandler
+from handlers.menu import MenuHandler
+from handlers.messages import MessageHandler
+from handlers.my_numbers import MyNumbersHandler
+from handlers.start import StartHandler
+from services.imports import ImportService
+from utils.loop_monitor import BlockingCallMonitor
+
+USER_ID = 1001
+
+class FakeMessage:
+    """Records what a handler sends back"""
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+    async def reply_photo(self, **kwargs):
+        self.replies.append(kwargs.get('caption', ''))
+
+class FakeQuery:
+    def __init__(self, data: str, user):
+        self.data = data
+        self.from_user = user
+        self.message = FakeMessage()
+        self.edits = []
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+class FakeClientPool:
+    """No Telegram account clients in tests"""
+
+    async def get(self, *args, **kwargs):
+        return None
+
+    def warm(self, *args):
+        pass
+
+def user():
+    return SimpleNamespace(id=USER_ID, username="tester", first_name="Test")
+
+def command(text: str) -> SimpleNamespace:
+    return SimpleNamespace(message=FakeMessage(text), effective_user=user())
+
+def callback(data: str) -> SimpleNamespace:
+    return SimpleNamespace(callback_query=FakeQuery(data, user()), effective_user=user())
+
+async def seed():
+    await CountriesDB.add_country('IN', 'India', 50)
+    await inventory.load()
+    await account_queue.load()
+    await ImportService.import_numbers(['+911111111111', '+912222222222'], 'IN')
+    await AccountsDB.add_account('s' * 60)
+
+async def drive(context) -> list:
+    """Walk through deposit, purchase and admin screens; returns the last texts"""
+    await StartHandler.handle_start(command('/start'), context)
+    await MenuHandler.handle_buy_menu(callback('buy_number'), context)
+    await MenuHandler.handle_deposit_menu(callback('deposit'), context)
+    await DepositHandler.handle_deposit_amount(callback('deposit_100'), context)
+    payment_info = context.user_data['payment_info']
+    await MessageHandler.handle_message(command('ABCDEF123456'), context)
+
+    # Reusing the UTR for a second deposit is refused from memory
+    await DepositHandler.handle_deposit_amount(callback('deposit_100'), context)
+    reused = command('ABCDEF123456')
+    await MessageHandler.handle_message(reused, context)
+
+    await BalanceHandler.handle_balance(callback('balance'), context)
+    await BuyHandler.handle_country_selection(callback('country_IN'), context)
+    await BuyHandler.handle_number_selection(callback('select_number_1'), context)
+    confirm = callback('confirm_buy_1')
+    await BuyHandler.handle_purchase_confirmation(confirm, context)
+    await MyNumbersHandler.handle_my_numbers(callback('my_numbers'), context)
+    await AdminHandler.handle_admin_dashboard(callback('admin_dashboard'), context)
+    await AdminHandler.handle_countries_list(callback('admin_countries'), context)
+    return [payment_info, reused.message.replies[-1], confirm.callback_query.edits[-1]]
+
+async def run(monitor: BlockingCallMonitor):
+    await db.connect()
+    try:
+        await seed()
+        context = SimpleNamespace(user_data={}, args=[], bot=SimpleNamespace(send_message=None))
+        monitor.install()
+        try:
+            results = await drive(context)
+        finally:
+            monitor.uninstall()
+        return results, await UserDB.get_user(USER_ID)
+    finally:
+        await db.close()
+
+def test_handlers_do_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(handlers.buy, 'client_pool', FakeClientPool())
+    monkeypatch.setattr(handlers.admin, 'ADMIN_IDS', [USER_ID])
+    monitor = BlockingCallMonitor(SLOW_CALLBACK_MS)
+
+    (payment_info, reused_reply, purchase_reply), account = asyncio.run(run(monitor))
+
+    monitor.check()
+    assert payment_info['amount'] == 100
+    assert "already been used" in reused_reply
+    assert "Purchase Successful" in purchase_reply
+    assert account['balance'] == 50
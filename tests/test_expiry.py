@@ -0,0 +1,112 @@
+"""Heap-driven expiry: ExpiryScheduler firing the CleanupService sweeps"""
+import asyncio
+
+import pytest
+
+import database.numbers
+import database.orders
+import database.payments
+import services.cleanup
+import services.purchase
+from database.db import db
+from database.accounts import AccountsDB
+from database.countries import CountriesDB
+from database.inventory import inventory
+from database.payments import PaymentsDB
+from database.reservations import account_queue
+from database.users import UserDB
+from services.cleanup import CleanupService
+from services.expiry import ExpiryScheduler
+from services.imports import ImportService
+from services.purchase import PurchaseService
+
+BUYER_ID = 7001
+TIMEOUT = 0.3
+
+NUMBER_STATE = "SELECT is_assigned, assigned_to FROM numbers WHERE number_id = ?"
+ORDER_STATUS = "SELECT status FROM orders WHERE order_id = ?"
+ACCOUNT_IN_USE = "SELECT is_in_use FROM accounts WHERE account_id = ?"
+PAYMENT_STATUS = "SELECT status FROM payments WHERE payment_id = ?"
+
+@pytest.fixture
+def scheduler(monkeypatch) -> ExpiryScheduler:
+    """A scheduler of its own, without deadlines left by other tests"""
+    scheduler = ExpiryScheduler()
+    for module in (database.numbers, database.orders, database.payments, services.cleanup, services.purchase):
+        monkeypatch.setattr(module, 'expiry_scheduler', scheduler)
+    return scheduler
+
+async def buy_one() -> dict:
+    await CountriesDB.add_country('IN', 'India', 50)
+    await ImportService.import_numbers(['+911111111111'], 'IN')
+    await AccountsDB.add_account("session-0-" + "s" * 60)
+    await inventory.load()
+    await account_queue.load()
+    await UserDB.register(BUYER_ID, "buyer")
+    await UserDB.update_balance(BUYER_ID, 100)
+    await CleanupService.start_scheduler()
+    purchase = await PurchaseService.purchase(BUYER_ID, 1)
+    assert purchase['success']
+    return purchase
+
+async def wait_for_sweeps(scheduler: ExpiryScheduler, kinds: int):
+    """Until the heap is empty and a handler has fired for each kind"""
+    for _ in range(100):
+        if scheduler.fired >= kinds and not scheduler.stats()['pending']:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"Expiry sweeps did not fire: {scheduler.stats()}")
+
+async def with_scheduler(scheduler: ExpiryScheduler, scenario):
+    await db.connect()
+    try:
+        return await scenario()
+    finally:
+        await scheduler.stop()
+        await db.close()
+
+def test_expired_reservation_releases_number_order_and_account(fresh_db, scheduler, monkeypatch):
+    monkeypatch.setattr(services.purchase, 'NUMBER_DURATION', TIMEOUT)
+
+    async def scenario():
+        purchase = await buy_one()
+        held = (inventory.available_count('IN'), len(account_queue))
+        # One heap entry fires the numbers sweep, the other the orders sweep
+        await wait_for_sweeps(scheduler, kinds=2)
+        return (
+            held,
+            await db.fetch_one(NUMBER_STATE, (purchase['number_id'],)),
+            await db.fetch_one(ORDER_STATUS, (purchase['order_id'],)),
+            await db.fetch_one(ACCOUNT_IN_USE, (purchase['account_id'],)),
+            (inventory.available_count('IN'), len(account_queue)),
+        )
+
+    held, number, order, account, freed = asyncio.run(with_scheduler(scheduler, scenario))
+    assert held == (0, 0)
+    assert tuple(number) == (0, None)
+    assert order[0] == 'expired'
+    assert account[0] == 0
+    assert freed == (1, 1)
+
+def test_finished_rows_are_skipped_when_their_deadline_fires(fresh_db, scheduler, monkeypatch):
+    monkeypatch.setattr(services.purchase, 'NUMBER_DURATION', TIMEOUT)
+    monkeypatch.setattr(database.payments, 'PAYMENT_TIMEOUT', TIMEOUT)
+
+    async def scenario():
+        purchase = await buy_one()
+        payment_id = await PaymentsDB.create_payment(BUYER_ID, 100)
+        assert await PaymentsDB.verify_utr(payment_id, "EXPIRY0001")
+        # Their heap entries stay behind; only the sweeps decide what is due
+        await db.write("UPDATE orders SET status = 'completed' WHERE order_id = ?", (purchase['order_id'],))
+        await wait_for_sweeps(scheduler, kinds=3)
+        return (
+            await db.fetch_one(ORDER_STATUS, (purchase['order_id'],)),
+            await db.fetch_one(ACCOUNT_IN_USE, (purchase['account_id'],)),
+            await db.fetch_one(PAYMENT_STATUS, (payment_id,)),
+        )
+
+    order, account, payment = asyncio.run(with_scheduler(scheduler, scenario))
+    assert order[0] == 'completed'
+    # The account stays with the completed order
+    assert account[0] == 1
+    assert payment[0] == 'completed'
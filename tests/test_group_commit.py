@@ -0,0 +1,94 @@
+"""Group commit on the writer: Database.write, _flush_writes, _commit_batch"""
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from database.db import db
+
+INSERT_USER = "INSERT INTO users (user_id, username) VALUES (?, ?)"
+# ROLLBACK conflict resolution aborts the whole transaction, not just the statement
+INSERT_OR_ROLLBACK = "INSERT OR ROLLBACK INTO users (user_id, username) VALUES (?, ?)"
+COUNT_USERS = "SELECT COUNT(*) FROM users WHERE user_id BETWEEN ? AND ?"
+
+async def with_db(scenario):
+    await db.connect()
+    try:
+        return await scenario()
+    finally:
+        await db.close()
+
+async def batches_during(writes) -> tuple:
+    """Run the writes concurrently; (results or exceptions, batches committed)"""
+    before = db.get_commit_stats()['batches']
+    results = await asyncio.gather(*writes, return_exceptions=True)
+    return results, db.get_commit_stats()['batches'] - before
+
+def test_lone_write_commits_without_waiting_for_the_window(monkeypatch):
+    monkeypatch.setattr(db, 'commit_window', 1.0)
+
+    async def scenario():
+        started = time.perf_counter()
+        _, batches = await batches_during([db.write(INSERT_USER, (5001, "lone"))])
+        elapsed = time.perf_counter() - started
+        count = await db.fetch_one(COUNT_USERS, (5001, 5001))
+        return elapsed, batches, count[0]
+
+    elapsed, batches, count = asyncio.run(with_db(scenario))
+    assert elapsed < 0.5
+    assert batches == 1
+    assert count == 1
+
+def test_concurrent_writes_share_one_commit():
+    async def scenario():
+        writes = [db.write(INSERT_USER, (5100 + i, f"batch{i}")) for i in range(20)]
+        results, batches = await batches_during(writes)
+        count = await db.fetch_one(COUNT_USERS, (5100, 5119))
+        return results, batches, count[0]
+
+    results, batches, count = asyncio.run(with_db(scenario))
+    assert [result.rowcount for result in results] == [1] * 20
+    assert batches == 1
+    assert count == 20
+
+def test_failed_statement_raises_to_its_own_caller_only():
+    async def scenario():
+        await db.write(INSERT_USER, (5200, "taken"))
+        writes = [
+            db.write(INSERT_USER, (5201, "before")),
+            db.write(INSERT_USER, (5200, "duplicate")),
+            db.write(INSERT_USER, (5202, "after")),
+        ]
+        results, batches = await batches_during(writes)
+        count = await db.fetch_one(COUNT_USERS, (5200, 5202))
+        return results, batches, count[0]
+
+    results, batches, count = asyncio.run(with_db(scenario))
+    assert batches == 1
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert results[0].rowcount == results[2].rowcount == 1
+    assert count == 3
+
+def test_lost_transaction_fails_only_its_own_batch():
+    async def scenario():
+        await db.write(INSERT_USER, (5300, "taken"))
+        results, _ = await batches_during([
+            db.write(INSERT_USER, (5301, "same batch")),
+            db.write(INSERT_OR_ROLLBACK, (5300, "duplicate")),
+        ])
+        # The writer is usable again for the next batch
+        later = await db.write(INSERT_USER, (5302, "next batch"))
+        count = await db.fetch_one(COUNT_USERS, (5301, 5302))
+        return results, later, count[0], db.conn.in_transaction
+
+    results, later, count, in_transaction = asyncio.run(with_db(scenario))
+    assert all(isinstance(result, sqlite3.IntegrityError) for result in results)
+    assert later.rowcount == 1
+    # 5301 was rolled back with its batch; 5302 committed
+    assert count == 1
+    assert not in_transaction
+
+def test_write_error_reaches_the_caller():
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(with_db(lambda: db.write("INSERT INTO no_such_table VALUES (1)")))
@@ -0,0 +1,92 @@
+"""Bulk imports: /importnumbers rows and session-string layouts"""
+import asyncio
+import base64
+import struct
+
+from database.db import db
+from database.countries import CountriesDB
+from database.inventory import inventory
+from services.imports import ImportService, _validate_session_file
+from utils.validators import OLD_SESSION_STRING_FORMATS, Validators
+
+AUTH_KEY = bytes(range(256))
+USER_ID = 777000123
+
+def pack(layout: str, *fields) -> str:
+    return base64.urlsafe_b64encode(struct.pack(layout, *fields)).decode().rstrip("=")
+
+async def import_twice(first: list, second: list) -> tuple:
+    await db.connect()
+    try:
+        await CountriesDB.add_country('IN', 'India', 50)
+        await inventory.load()
+        reports = [
+            await ImportService.import_numbers(first, chunk_size=2),
+            await ImportService.import_numbers(second, 'IN', chunk_size=2),
+        ]
+        count = await db.fetch_one("SELECT COUNT(*) FROM numbers")
+        return reports, count[0], inventory.available_count('IN')
+    finally:
+        await db.close()
+
+def test_import_numbers_counts_duplicate_and_invalid_rows(fresh_db):
+    first = [
+        "# country,number",
+        "IN,+911111111111",
+        "in;+912222222222",
+        "IN,+911111111111",
+        "",
+        "IN,911111111111",
+        "IN,+91 1111 111111",
+        "+913333333333",
+        "XX,+914444444444",
+    ]
+    second = ["IN,+912222222222", "+915555555555"]
+    reports, count, available = asyncio.run(import_twice(first, second))
+
+    report = reports[0]
+    assert (report['rows'], report['inserted'], report['duplicate']) == (7, 2, 1)
+    # No "+", a spaced number, and no country for a bare number
+    assert report['invalid'] == 3
+    assert report['unknown_country'] == 1
+
+    # Numbers from an earlier import are duplicates; a bare number takes
+    # the country given for the whole import
+    report = reports[1]
+    assert (report['inserted'], report['duplicate'], report['invalid']) == (1, 1, 0)
+    assert count == available == 3
+
+def test_new_session_string_layout_decodes_with_api_id():
+    session_string = Validators.encode_session_string(2, 12345, False, AUTH_KEY, USER_ID, False)
+    assert Validators.decode_session_string(session_string) == {
+        'dc_id': 2, 'api_id': 12345, 'test_mode': False, 'user_id': USER_ID, 'is_bot': False,
+    }
+
+def test_old_session_string_layouts_decode_by_length():
+    for length, layout in OLD_SESSION_STRING_FORMATS.items():
+        session_string = pack(layout, 4, False, AUTH_KEY, USER_ID, False)
+        assert len(session_string) == length
+        assert Validators.decode_session_string(session_string) == {
+            'dc_id': 4, 'api_id': None, 'test_mode': False, 'user_id': USER_ID, 'is_bot': False,
+        }
+
+def test_session_file_lines_in_every_layout():
+    old, older = (pack(layout, 1, False, AUTH_KEY, USER_ID + n, False)
+                  for n, layout in enumerate(OLD_SESSION_STRING_FORMATS.values(), 1))
+    lines = [
+        Validators.encode_session_string(5, 1, False, AUTH_KEY, USER_ID, False),
+        old,
+        older,
+        Validators.encode_session_string(5, 1, False, AUTH_KEY, USER_ID + 9, True),
+        "not-a-session-" * 5,
+        Validators.encode_session_string(9, 1, False, AUTH_KEY, USER_ID, False),
+    ]
+    data = "\n".join(lines).encode()
+    results = _validate_session_file("sessions.txt", lambda: data)
+
+    assert [item['status'] for item in results] == ['valid', 'valid', 'valid', 'invalid', 'invalid', 'invalid']
+    assert [item.get('user_id') for item in results[:3]] == [USER_ID, USER_ID + 1, USER_ID + 2]
+    assert results[3]['reason'] == "Bot sessions are not supported"
+    # Garbage and an out-of-range data center fail the same offline decode
+    assert results[4]['reason'] == results[5]['reason'] == "Invalid session string format"
+    assert results[1]['source'] == "sessions.txt:2"
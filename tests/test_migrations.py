@@ -0,0 +1,87 @@
+"""Upgrading the shipped legacy database onto the balance ledger"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from database.db import db
+from database.ledger import LedgerDB
+from database.users import UserDB
+
+TELEGRAM_ID = 3001
+
+# The tables of virtual_numbers.db as first shipped
+LEGACY_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        telegram_id INTEGER UNIQUE NOT NULL,
+        username TEXT,
+        balance REAL DEFAULT 0.0,
+        total_deposits REAL DEFAULT 0.0,
+        total_spent REAL DEFAULT 0.0,
+        join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_banned INTEGER DEFAULT 0
+    );
+    CREATE TABLE countries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL,
+        code TEXT, flag TEXT, is_active INTEGER DEFAULT 1
+    );
+    CREATE TABLE accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, phone_number TEXT UNIQUE NOT NULL,
+        session_string TEXT NOT NULL, api_id TEXT, api_hash TEXT, country_id INTEGER,
+        is_active INTEGER DEFAULT 1, is_used INTEGER DEFAULT 0,
+        added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, last_used TIMESTAMP
+    );
+    CREATE TABLE virtual_numbers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, number TEXT UNIQUE NOT NULL,
+        country_id INTEGER, account_id INTEGER, user_id INTEGER, price REAL,
+        status TEXT DEFAULT 'available', purchase_date TIMESTAMP, expiry_date TIMESTAMP
+    );
+    CREATE TABLE payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, amount REAL NOT NULL,
+        payment_id TEXT UNIQUE, utr TEXT, status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, verified_at TIMESTAMP, expires_at TIMESTAMP
+    );
+    CREATE TABLE orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, number_id INTEGER,
+        amount REAL NOT NULL, status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, otp_code TEXT, otp_received INTEGER DEFAULT 0
+    );
+"""
+
+async def upgrade_and_snapshot():
+    await db.connect()
+    try:
+        await LedgerDB.seed_snapshots()
+        totals = await LedgerDB.get_totals(TELEGRAM_ID)
+        await UserDB.update_balance(TELEGRAM_ID, 10)
+        await LedgerDB.snapshot()
+        return dict(totals)
+    finally:
+        await db.close()
+
+def test_fractional_legacy_balances_survive_the_mirror(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO users (telegram_id, username, balance, total_deposits, total_spent) VALUES (?, ?, ?, ?, ?)",
+        (TELEGRAM_ID, "legacy", 150.5, 200.0, 49.5)
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, 'db_name', path)
+
+    totals = asyncio.run(upgrade_and_snapshot())
+
+    assert (totals['balance'], totals['total_deposits'], totals['total_spent']) == (15050, 20000, 4950)
+    conn = sqlite3.connect(path)
+    row = conn.execute(
+        "SELECT balance, total_deposits, total_spent FROM users WHERE user_id = ?", (TELEGRAM_ID,)
+    ).fetchone()
+    conn.close()
+    assert row == (160.5, 210.0, 49.5)
+
+def test_update_user_rejects_ledger_fields():
+    with pytest.raises(ValueError):
+        asyncio.run(UserDB.update_user(TELEGRAM_ID, balance=0))
@@ -0,0 +1,66 @@
+"""Concurrent purchases competing for the last number or account"""
+import asyncio
+
+from database.db import db
+from database.accounts import AccountsDB
+from database.countries import CountriesDB
+from database.inventory import inventory
+from database.ledger import LedgerDB
+from database.reservations import account_queue
+from database.users import UserDB
+from services.imports import ImportService
+from services.purchase import PurchaseService
+
+BUYERS = (6001, 6002)
+COUNT_LEDGER = "SELECT COUNT(*) FROM balance_ledger WHERE user_id = ?"
+
+async def stock(numbers: list, accounts: int) -> list:
+    await CountriesDB.add_country('IN', 'India', 50)
+    await ImportService.import_numbers(numbers, 'IN')
+    for index in range(accounts):
+        await AccountsDB.add_account(f"session-{index}-" + "s" * 60)
+    await inventory.load()
+    await account_queue.load()
+    for user_id in BUYERS:
+        await UserDB.register(user_id, f"buyer{user_id}")
+        await UserDB.update_balance(user_id, 100)
+    rows = await db.fetch_all("SELECT number_id FROM numbers ORDER BY number_id")
+    return [row[0] for row in rows]
+
+async def ledger_state(user_id: int) -> tuple:
+    totals = await LedgerDB.get_totals(user_id)
+    entries = await db.fetch_one(COUNT_LEDGER, (user_id,))
+    return totals['balance'], entries[0]
+
+async def race(numbers: list, accounts: int, same_number: bool):
+    await db.connect()
+    try:
+        number_ids = await stock(numbers, accounts)
+        before = [await ledger_state(user_id) for user_id in BUYERS]
+        targets = [number_ids[0], number_ids[0] if same_number else number_ids[1]]
+        results = await asyncio.gather(*(
+            PurchaseService.purchase(user_id, number_id) for user_id, number_id in zip(BUYERS, targets)
+        ))
+        after = [await ledger_state(user_id) for user_id in BUYERS]
+        return results, before, after
+    finally:
+        await db.close()
+
+def assert_one_winner(results, before, after, loser_error):
+    assert sorted(result['success'] for result in results) == [False, True]
+    winner = 0 if results[0]['success'] else 1
+    loser = 1 - winner
+    assert results[loser]['error'] == loser_error
+    # The winner paid once; the loser's balance and ledger are untouched
+    assert after[winner] == (before[winner][0] - 5000, before[winner][1] + 1)
+    assert after[loser] == before[loser]
+
+def test_two_buyers_for_the_last_number(fresh_db):
+    results, before, after = asyncio.run(race(['+911111111111'], accounts=2, same_number=True))
+    assert_one_winner(results, before, after, 'number_unavailable')
+
+def test_two_buyers_for_the_last_account(fresh_db):
+    results, before, after = asyncio.run(
+        race(['+911111111111', '+912222222222'], accounts=1, same_number=False)
+    )
+    assert_one_winner(results, before, after, 'no_account')
@@ -0,0 +1,32 @@
+"""EXPLAIN QUERY PLAN over the registered hot statements"""
+import asyncio
+
+# Importing the DAOs and services registers their statements
+import database.accounts
+import database.countries
+import database.ledger
+import database.numbers
+import database.orders
+import database.payments
+import database.users
+import services.purchase
+from database.db import db
+from database.migrations import HOT_STATEMENTS, check_query_plans
+
+async def plans(statements) -> list:
+    await db.connect()
+    try:
+        return await check_query_plans(db.conn, statements)
+    finally:
+        await db.close()
+
+def test_hot_statements_are_registered():
+    missing = [name for name in HOT_STATEMENTS if name not in db.statements]
+    assert not missing, f"HOT_STATEMENTS names no registered statement: {missing}"
+
+def test_hot_statements_use_indexes():
+    assert asyncio.run(plans(db.statements)) == []
+
+def test_table_scan_is_reported():
+    statements = {'users.get_user': "SELECT user_id FROM users WHERE username = ?"}
+    assert asyncio.run(plans(statements)) == ["users.get_user: SCAN users"]
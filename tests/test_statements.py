@@ -0,0 +1,70 @@
+"""Bank statement parsing and matching for /importutr"""
+import asyncio
+
+from database.db import db
+from database.ledger import LedgerDB
+from database.payments import PaymentsDB
+from database.users import UserDB
+from services.statements import StatementService, parse_statement
+
+PAYER_ID = 2001
+OTHER_ID = 2002
+
+def test_signed_amount_with_dr_cr_column_keeps_credits_only():
+    lines = [
+        "Statement for account 1234",
+        "Date,Narration,UTR No,Amount,Dr/Cr",
+        "1/1,UPI/Payment ID: 7,U1,250.00,CR",
+        "1/1,UPI/rent,U2,-250.00,DR",
+        "1/1,UPI/shop,U3,\"1,000.00\",Dr.",
+        "1/1,UPI/refund,U4,99.50,Cr.",
+    ]
+    assert list(parse_statement(lines)) == [
+        ("U1", 25000, "UPI/Payment ID: 7"),
+        ("U4", 9950, "UPI/refund"),
+    ]
+
+def test_withdrawal_and_deposit_columns_keep_credits_only():
+    lines = [
+        "Date,Narration,Ref No,Withdrawal Amt,Deposit Amt",
+        "1/1,UPI/out,U1,500.00,",
+        "1/1,UPI/out,U2,500.00,0.00",
+        "1/1,UPI/in,U3,,500.00",
+    ]
+    assert list(parse_statement(lines)) == [("U3", 50000, "UPI/in")]
+
+def test_amount_without_dr_cr_column_is_not_a_header():
+    lines = ["UTR,Amount,Remarks", "U1,250,Payment ID: 7"]
+    assert list(parse_statement(lines)) == []
+
+async def import_statement(template: str):
+    await db.connect()
+    try:
+        await UserDB.register(PAYER_ID, "payer")
+        await UserDB.register(OTHER_ID, "other")
+        named = await PaymentsDB.create_payment(PAYER_ID, 250)
+        unnamed = await PaymentsDB.create_payment(OTHER_ID, 300)
+        lines = template.format(named=named, unnamed=unnamed).splitlines()
+        report = await StatementService.import_statement(lines)
+        payer = await LedgerDB.get_totals(PAYER_ID)
+        other = await LedgerDB.get_totals(OTHER_ID)
+        return report, payer['balance'], other['balance']
+    finally:
+        await db.close()
+
+def test_only_payment_id_matches_are_credited():
+    statement = """Date,Narration,UTR No,Amount,Dr/Cr
+1/1,UPI/Payment ID: {named},S1,250.00,CR
+1/1,UPI/Payment ID: {unnamed},S2,300.00,DR
+1/1,UPI/someone else,S3,300.00,CR
+1/1,UPI/Payment ID: {unnamed},S4,301.00,CR
+1/1,UPI/unrelated,S5,999.00,CR"""
+    report, payer_balance, other_balance = asyncio.run(import_statement(statement))
+
+    assert report['matched'] == 1
+    assert report['review'] == 2
+    assert [item['utr'] for item in report['review_items']] == ["S3", "S4"]
+    assert report['unmatched'] == 1
+    assert payer_balance == 25000
+    # The debit and the amount-only credit were not applied
+    assert other_balance == 0
@@ -0,0 +1,59 @@
+"""Write-through user cache: fills racing balance writes, lookup counters"""
+import asyncio
+
+from database.db import db
+from database.ledger import LedgerDB
+from database.users import UserDB, user_cache
+
+USER_ID = 4001
+
+async def fill_racing_a_credit(monkeypatch):
+    await db.connect()
+    try:
+        await UserDB.register(USER_ID, "racer")
+        user_cache.pop(USER_ID)
+
+        read_done = asyncio.Event()
+        credited = asyncio.Event()
+        get_totals = LedgerDB.get_totals
+
+        async def totals_read_before_the_credit(user_id):
+            totals = dict(await get_totals(user_id))
+            read_done.set()
+            await credited.wait()
+            return totals
+
+        monkeypatch.setattr(LedgerDB, 'get_totals', staticmethod(totals_read_before_the_credit))
+        fill = asyncio.create_task(UserDB.get_user(USER_ID))
+        await read_done.wait()
+        await UserDB.update_balance(USER_ID, 75)
+        credited.set()
+        await fill
+        monkeypatch.setattr(LedgerDB, 'get_totals', staticmethod(get_totals))
+
+        cached = user_cache.peek(USER_ID)
+        user = await UserDB.get_user(USER_ID)
+        return cached, user['balance']
+    finally:
+        await db.close()
+
+def test_fill_overlapping_a_write_is_not_cached(monkeypatch):
+    cached, balance = asyncio.run(fill_racing_a_credit(monkeypatch))
+    assert cached is None
+    assert balance == 75
+
+async def credit_cached_user():
+    await db.connect()
+    try:
+        await UserDB.register(USER_ID + 1, "counted")
+        stats = user_cache.stats()
+        await UserDB.update_balance(USER_ID + 1, 10)
+        await UserDB.update_balance(USER_ID + 1, -4)
+        return stats, user_cache.stats(), user_cache.peek(USER_ID + 1)['balance']
+    finally:
+        await db.close()
+
+def test_write_through_does_not_count_lookups():
+    before, after, balance = asyncio.run(credit_cached_user())
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+    assert balance == 6
@@ -0,0 +1,51 @@
+"""UTR reuse across a restart: the seen-UTR set warmed from the database"""
+import asyncio
+
+import database.payments
+from database.db import db
+from database.ledger import LedgerDB
+from database.payments import PaymentsDB
+from database.users import UserDB
+from database.utrs import SeenUtrs
+
+PAYER_ID = 8001
+UTR = "412345678901"
+PAYMENT_STATUS = "SELECT status, utr FROM payments WHERE payment_id = ?"
+
+async def pay_before_restart() -> int:
+    await db.connect()
+    try:
+        await UserDB.register(PAYER_ID, "payer")
+        payment_id = await PaymentsDB.create_payment(PAYER_ID, 100)
+        assert await PaymentsDB.verify_utr(payment_id, UTR)
+        return payment_id
+    finally:
+        await db.close()
+
+async def reuse_after_restart(seen: SeenUtrs):
+    await db.connect()
+    try:
+        await seen.load()
+        before = await LedgerDB.get_totals(PAYER_ID)
+        payment_id = await PaymentsDB.create_payment(PAYER_ID, 100)
+        accepted = await PaymentsDB.verify_utr(payment_id, f" {UTR} ")
+        after = await LedgerDB.get_totals(PAYER_ID)
+        payment = await db.fetch_one(PAYMENT_STATUS, (payment_id,))
+        return accepted, before['balance'], after['balance'], tuple(payment)
+    finally:
+        await db.close()
+
+def test_utr_used_before_a_restart_is_rejected_from_the_warm_set(fresh_db, monkeypatch):
+    asyncio.run(pay_before_restart())
+
+    # A new process starts with an empty set and loads it at startup
+    seen = SeenUtrs()
+    monkeypatch.setattr(database.payments, 'seen_utrs', seen)
+    accepted, before, after, payment = asyncio.run(reuse_after_restart(seen))
+
+    assert seen.loaded and UTR in seen
+    assert not accepted
+    # Rejected by the set, before any write reached SQLite
+    assert seen.rejected == 1
+    assert after == before == 10000
+    assert payment == ('pending', None)
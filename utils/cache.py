@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, List
+
+_MISSING = object()
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry and mark it recently used"""
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry without counting a lookup or touching LRU order"""
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING and entry[0] > time.monotonic():
+            return entry[1]
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        """Store an entry, evicting the least recently used one if full"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Drop an entry"""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self):
+        """Drop every entry"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+class Fill:
+    """One in-flight cache fill; stale once a write to its key overlapped it"""
+    __slots__ = ('stale',)
+
+    def __init__(self, stale: bool):
+        self.stale = stale
+
+class FillGuard:
+    """Keeps a read-then-cache fill from storing a value a write outdated.
+
+    Writers that patch cached entries wrap the database write and the
+    patch in writing(key); fills wrap the read in filling(key) and store
+    only if the fill is not stale. A fill is stale if a write to the same
+    key was running when it started or began before it finished, so a
+    patch never lands on, or is lost under, a value read around it.
+    Only keys with work in flight are tracked.
+    """
+
+    def __init__(self):
+        self._writing: Dict[Hashable, int] = {}
+        self._fills: Dict[Hashable, List[Fill]] = {}
+
+    @contextmanager
+    def filling(self, key: Hashable) -> Iterator[Fill]:
+        fill = Fill(stale=key in self._writing)
+        self._fills.setdefault(key, []).append(fill)
+        try:
+            yield fill
+        finally:
+            fills = self._fills[key]
+            fills.remove(fill)
+            if not fills:
+                del self._fills[key]
+
+    def invalidate(self, key: Hashable):
+        """Mark the fills in flight for `key` stale"""
+        for fill in self._fills.get(key, ()):
+            fill.stale = True
+
+    @contextmanager
+    def writing(self, key: Hashable) -> Iterator[None]:
+        self.invalidate(key)
+        self._writing[key] = self._writing.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            self._writing[key] -= 1
+            if not self._writing[key]:
+                del self._writing[key]
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+class BlockingCallMonitor(logging.Handler):
+    """Catches handlers that block the event loop.
+
+    Puts the loop in asyncio debug mode, where every callback running
+    longer than `slow_callback_duration` is reported on the "asyncio"
+    logger as "Executing <handle> took N seconds". This handler counts
+    those reports and keeps the most recent ones.
+    """
+
+    def __init__(self, threshold_ms: int):
+        super().__init__(level=logging.WARNING)
+        self.threshold_ms = threshold_ms
+        self.slow_callbacks = 0
+        self.recent = deque(maxlen=20)
+
+    def install(self, loop: asyncio.AbstractEventLoop = None):
+        """Enable debug mode on the loop and start collecting reports"""
+        loop = loop or asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.threshold_ms / 1000
+        logging.getLogger("asyncio").addHandler(self)
+        logger.info(f"Blocking call detection enabled ({self.threshold_ms} ms)")
+
+    def uninstall(self):
+        """Stop collecting reports"""
+        logging.getLogger("asyncio").removeHandler(self)
+
+    def emit(self, record: logging.LogRecord):
+        if not str(record.msg).startswith("Executing"):
+            return
+        self.slow_callbacks += 1
+        self.recent.append(record.getMessage())
+
+    def check(self):
+        """Raise if any callback blocked the loop since installation"""
+        if self.slow_callbacks:
+            raise RuntimeError(
+                f"{self.slow_callbacks} callbacks blocked the event loop for more than "
+                f"{self.threshold_ms} ms, most recently: {list(self.recent)[-3:]}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Slow callback count and the latest offenders"""
+        return {
+            'threshold_ms': self.threshold_ms,
+            'slow_callbacks': self.slow_callbacks,
+            'recent': list(self.recent),
+        }
@@ -1,4 +1,11 @@
+import base64
 import re
+import struct
+
+# Pyrogram session string layouts: the current one, and two older ones
+# (32- and 64-bit user ids) told apart by the string length
+SESSION_STRING_FORMAT = ">BI?256sQ?"
+OLD_SESSION_STRING_FORMATS = {351: ">B?256sI?", 356: ">B?256sQ?"}
 
 class Validators:
     @staticmethod
@@ -45,5 +52,43 @@ class Validators:
         if len(session_string) < 50:
             return False, "Invalid session string length"
         
-        # Basic validation (can be extended)
-        return True, "Session string is valid"
\ No newline at end of file
+        session = Validators.decode_session_string(session_string)
+        if not session:
+            return False, "Invalid session string format"
+        if session['is_bot']:
+            return False, "Bot sessions are not supported"
+        
+        return True, "Session string is valid"
+    
+    @staticmethod
+    def decode_session_string(session_string):
+        """Decode a Pyrogram session string offline, or return None"""
+        session_string = session_string.strip()
+        try:
+            packed = base64.urlsafe_b64decode(session_string + "=" * (-len(session_string) % 4))
+            old_format = OLD_SESSION_STRING_FORMATS.get(len(session_string))
+            if old_format:
+                dc_id, test_mode, auth_key, user_id, is_bot = struct.unpack(old_format, packed)
+                api_id = None
+            else:
+                dc_id, api_id, test_mode, auth_key, user_id, is_bot = struct.unpack(SESSION_STRING_FORMAT, packed)
+        except (ValueError, struct.error):
+            return None
+        
+        if not 1 <= dc_id <= 5 or not user_id:
+            return None
+        return {
+            'dc_id': dc_id,
+            'api_id': api_id,
+            'test_mode': test_mode,
+            'user_id': user_id,
+            'is_bot': is_bot,
+        }
+    
+    @staticmethod
+    def encode_session_string(dc_id, api_id, test_mode, auth_key, user_id, is_bot):
+        """Pack session fields (e.g. from a .session file) into a session string"""
+        packed = struct.pack(
+            SESSION_STRING_FORMAT, dc_id, api_id or 0, bool(test_mode), auth_key, user_id, bool(is_bot)
+        )
+        return base64.urlsafe_b64encode(packed).decode().rstrip("=")
\ No newline at end of file